@@ -1,8 +1,37 @@
+import argparse
+import bisect
+import dbm
+import heapq
+import itertools
+import json
+import mmap
+import os
+import queue
+import re
+import secrets
+import struct
+import sys
+import threading
+import time
+import traceback
+import uuid
+from array import array
+from collections import OrderedDict, namedtuple
+from contextlib import contextmanager
+
+def _to_paise(amount):
+    # Prices and totals are held as integer paise so running cart totals
+    # stay exact; the getters keep returning rupees.
+    return round(amount * 100)
+
 class Product:
+    _type_name = "product"
+    _weight_grams = 0
+
     def __init__(self, product_id, name, price, quantity_available):
         self._product_id = product_id
         self._name = name
-        self._price = price
+        self._price = _to_paise(price)
         self._quantity_available = quantity_available
 
     def get_product_id(self):
@@ -12,67 +41,66 @@ class Product:
         return self._name
 
     def get_price(self):
-        return self._price
+        return self._price / 100
 
     def get_quantity_available(self):
         return self._quantity_available
 
     def set_quantity_available(self, value):
-        if value >= 0:
-            self._quantity_available = value
-        else:
-            print("Error: Quantity available cannot be negative.")
+        if value < 0:
+            return False
+        self._quantity_available = value
+        return True
 
     def decrease_quantity(self, amount):
-        if not isinstance(amount, int) or amount <= 0:
-            print("Error: Amount to decrease must be a positive integer.")
-            return False
-        if self._quantity_available >= amount:
-            self._quantity_available -= amount
-            return True
-        else:
-            print(f"Not enough stock for {self._name}. Available: {self._quantity_available}")
+        if not isinstance(amount, int) or amount <= 0 or self._quantity_available < amount:
             return False
+        self._quantity_available -= amount
+        return True
 
     def increase_quantity(self, amount):
         if not isinstance(amount, int) or amount <= 0:
-            print("Error: Amount to increase must be a positive integer.")
-            return
+            return False
         self._quantity_available += amount
+        return True
 
     def display_details(self):
         return (f"Product ID: {self._product_id}, Name: {self._name}, "
-                f"Price: ₹{self._price:.2f}, Available: {self._quantity_available}")
+                f"Price: ₹{self.get_price():.2f}, Available: {self._quantity_available}")
 
     def to_dict(self):
         return {
             "product_id": self._product_id,
             "name": self._name,
-            "price": self._price,
+            "price": self.get_price(),
             "quantity_available": self._quantity_available,
-            "type": "product"
+            "type": self._type_name
         }
 
 class PhysicalProduct(Product):
+    _type_name = "physical"
+
     def __init__(self, product_id, name, price, quantity_available, weight):
         super().__init__(product_id, name, price, quantity_available)
         self._weight = weight
+        self._weight_grams = round(weight * 1000)
 
     def get_weight(self):
         return self._weight
 
     def display_details(self):
         return (f"Product ID: {self._product_id}, Name: {self._name}, "
-                f"Price: ₹{self._price:.2f}, Available: {self._quantity_available}, "
+                f"Price: ₹{self.get_price():.2f}, Available: {self._quantity_available}, "
                 f"Weight: {self._weight:.2f} kg")
 
     def to_dict(self):
         data = super().to_dict()
         data["weight"] = self._weight
-        data["type"] = "physical"
         return data
 
 class DigitalProduct(Product):
+    _type_name = "digital"
+
     def __init__(self, product_id, name, price, quantity_available, download_link):
         super().__init__(product_id, name, price, quantity_available)
         self._download_link = download_link
@@ -82,15 +110,268 @@ class DigitalProduct(Product):
 
     def display_details(self):
         return (f"Product ID: {self._product_id}, Name: {self._name}, "
-                f"Price: ₹{self._price:.2f}, Available: {self._quantity_available}, "
+                f"Price: ₹{self.get_price():.2f}, Available: {self._quantity_available}, "
                 f"Download Link: {self._download_link} (placeholder)")
 
     def to_dict(self):
         data = super().to_dict()
         data["download_link"] = self._download_link
-        data["type"] = "digital"
         return data
 
+def product_from_dict(data):
+    # Inverse of to_dict(), dispatching on its "type" field.
+    kind = data.get("type", "product")
+    if kind == "physical":
+        return PhysicalProduct(data["product_id"], data["name"], data["price"], data["quantity_available"], data["weight"])
+    if kind == "digital":
+        return DigitalProduct(data["product_id"], data["name"], data["price"], data["quantity_available"], data["download_link"])
+    if kind == "product":
+        return Product(data["product_id"], data["name"], data["price"], data["quantity_available"])
+    raise ValueError(f"Unknown product type: {kind!r}")
+
+def save_catalog_jsonl(path, products, chunk_size=10000):
+    # One to_dict() per line, written a chunk at a time; returns the count.
+    count = 0
+    products = iter(products)
+    with open(path, "w", encoding="utf-8", buffering=1 << 20) as f:
+        while True:
+            chunk = [json.dumps(p.to_dict()) for p in itertools.islice(products, chunk_size)]
+            if not chunk:
+                return count
+            chunk.append("")
+            f.write("\n".join(chunk))
+            count += len(chunk) - 1
+
+def iter_catalog_jsonl(path):
+    with open(path, encoding="utf-8", buffering=1 << 20) as f:
+        for line in f:
+            if line.strip():
+                yield product_from_dict(json.loads(line))
+
+def save_carts_jsonl(path, carts):
+    # carts yields (cart_id, ShoppingCart) pairs.
+    with open(path, "w", encoding="utf-8", buffering=1 << 20) as f:
+        for cart_id, cart in carts:
+            data = cart.to_dict()
+            data["cart_id"] = cart_id
+            f.write(json.dumps(data) + "\n")
+
+def iter_carts_jsonl(path, inventory):
+    # Yields (cart_id, ShoppingCart) pairs rebuilt against inventory.
+    with open(path, encoding="utf-8", buffering=1 << 20) as f:
+        for line in f:
+            if line.strip():
+                data = json.loads(line)
+                yield data.get("cart_id"), ShoppingCart.from_dict(data, inventory)
+
+class CatalogStore:
+    # Read-only product catalog in one memory-mapped file. Numeric columns
+    # (price paise, stock, weight grams, type) are arrays viewed straight
+    # from the mapping; strings are offset arrays plus UTF-8 blobs. The file
+    # also carries row orders sorted by price, by case-folded name and by
+    # product_id, so lookups, prefix search and price ranges are bisections
+    # over the mapping. Product objects are only built for rows returned.
+    # Arrays are in native byte order.
+    MAGIC = b"CATSTOR1"
+    TYPE_NAMES = ("product", "physical", "digital")
+    _SECTIONS = ("price", "quantity", "weight", "type", "id_offsets", "id_blob", "name_offsets", "name_blob",
+                 "link_offsets", "link_blob", "price_order", "name_order", "id_order")
+    _HEADER = struct.Struct("<8sq13q")
+
+    def __init__(self, path):
+        self._file = open(path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self._count, *offsets = self._HEADER.unpack_from(self._mmap, 0)
+        if magic != self.MAGIC:
+            raise ValueError(f"{path} is not a catalog store")
+        view = memoryview(self._mmap)
+        ends = offsets[1:] + [len(self._mmap)]
+        sections = {name: view[start:end] for name, start, end in zip(self._SECTIONS, offsets, ends)}
+        n = self._count
+        self._price = sections["price"].cast('q')
+        self._quantity = sections["quantity"].cast('q')
+        self._weight = sections["weight"].cast('q')
+        self._type = sections["type"][:n].cast('b')
+        self._strings = {}
+        for column in ("id", "name", "link"):
+            self._strings[column] = (sections[column + "_offsets"].cast('q'), sections[column + "_blob"])
+        self._price_order = sections["price_order"].cast('q')
+        self._name_order = sections["name_order"].cast('q')
+        self._id_order = sections["id_order"].cast('q')
+        # The typed views are released too: a page iterator may still hold
+        # one when close() unmaps the file.
+        self._views = [view] + list(sections.values()) + [self._price, self._quantity, self._weight, self._type,
+                       self._price_order, self._name_order, self._id_order]
+        self._views += [offsets for offsets, blob in self._strings.values()]
+        self._token_index = None
+        self._type_index = None
+
+    @classmethod
+    def build(cls, path, products):
+        # Writes products (any iterable of Product objects) to path.
+        price, quantity, weight, types = array('q'), array('q'), array('q'), array('b')
+        strings = {column: (array('q', [0]), bytearray()) for column in ("id", "name", "link")}
+        type_codes = {name: code for code, name in enumerate(cls.TYPE_NAMES)}
+        ids, names = [], []
+        for product in products:
+            price.append(product._price)
+            quantity.append(product._quantity_available)
+            weight.append(product._weight_grams)
+            types.append(type_codes[product._type_name])
+            link = product._download_link if isinstance(product, DigitalProduct) else ""
+            for column, value in (("id", product._product_id), ("name", product._name), ("link", link)):
+                offsets, blob = strings[column]
+                blob += value.encode()
+                offsets.append(len(blob))
+            ids.append(product._product_id)
+            names.append(product._name.casefold())
+        rows = range(len(price))
+        sections = {
+            "price": price, "quantity": quantity, "weight": weight, "type": types,
+            "price_order": array('q', sorted(rows, key=price.__getitem__)),
+            "name_order": array('q', sorted(rows, key=names.__getitem__)),
+            "id_order": array('q', sorted(rows, key=ids.__getitem__)),
+        }
+        for column, (offsets, blob) in strings.items():
+            sections[column + "_offsets"], sections[column + "_blob"] = offsets, blob
+        with open(path, "wb") as f:
+            f.write(bytes(cls._HEADER.size))
+            offsets = []
+            for name in cls._SECTIONS:
+                f.write(bytes(-f.tell() % 8))
+                offsets.append(f.tell())
+                f.write(sections[name])
+            f.seek(0)
+            f.write(cls._HEADER.pack(cls.MAGIC, len(price), *offsets))
+
+    def close(self):
+        # Page iterators still open do not pin the mapping; reading one
+        # after close() raises ValueError. Iterating the store itself
+        # finishes the block of rows it has already decoded first.
+        self._price = self._quantity = self._weight = self._type = None
+        self._price_order = self._name_order = self._id_order = None
+        self._strings = {}
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        self._mmap.close()
+        self._file.close()
+
+    def __len__(self):
+        return self._count
+
+    def _string(self, column, row):
+        offsets, blob = self._strings[column]
+        return str(blob[offsets[row]:offsets[row + 1]], "utf-8")
+
+    def _name_key(self, row):
+        return self._string("name", row).casefold()
+
+    def product_at(self, row):
+        product_id, name = self._string("id", row), self._string("name", row)
+        price, quantity = self._price[row] / 100, self._quantity[row]
+        kind = self._type[row]
+        if kind == 1:
+            return PhysicalProduct(product_id, name, price, quantity, self._weight[row] / 1000)
+        if kind == 2:
+            return DigitalProduct(product_id, name, price, quantity, self._string("link", row))
+        return Product(product_id, name, price, quantity)
+
+    def get(self, product_id):
+        order = self._id_order
+        i = bisect.bisect_left(order, product_id, key=lambda row: self._string("id", row))
+        if i < len(order) and self._string("id", order[i]) == product_id:
+            return self.product_at(order[i])
+        return None
+
+    def _check_open(self):
+        if self._mmap.closed:
+            raise ValueError("catalog store is closed")
+
+    def _pages(self, rows, page_size):
+        rows = iter(rows)
+        while True:
+            self._check_open()
+            page = [self.product_at(row) for row in itertools.islice(rows, page_size)]
+            if not page:
+                return
+            yield page
+
+    def pages(self, page_size=50):
+        return self._pages(range(self._count), page_size)
+
+    def __iter__(self):
+        # Full decode straight from the columns, a block of rows at a time:
+        # each string blob is sliced once per block and no per-row dicts
+        # are built.
+        block = 65536
+        for start in range(0, self._count, block):
+            self._check_open()
+            end = min(start + block, self._count)
+            columns = []
+            for column in ("id", "name", "link"):
+                offsets, blob = self._strings[column]
+                base = offsets[start]
+                data = bytes(blob[base:offsets[end]])
+                bounds = offsets[start:end + 1].tolist()
+                columns.append([data[a - base:b - base].decode() for a, b in zip(bounds, bounds[1:])])
+            prices, quantities = self._price[start:end].tolist(), self._quantity[start:end].tolist()
+            weights, kinds = self._weight[start:end].tolist(), self._type[start:end].tolist()
+            for product_id, name, link, price, quantity, weight, kind in zip(*columns, prices, quantities, weights, kinds):
+                if kind == 1:
+                    yield PhysicalProduct(product_id, name, price / 100, quantity, weight / 1000)
+                elif kind == 2:
+                    yield DigitalProduct(product_id, name, price / 100, quantity, link)
+                else:
+                    yield Product(product_id, name, price / 100, quantity)
+
+    def search_prefix(self, prefix, page_size=50):
+        # Products whose name starts with prefix (case-insensitive), by name.
+        prefix = prefix.casefold()
+        order = self._name_order
+        start = bisect.bisect_left(order, prefix, key=self._name_key)
+        rows = itertools.takewhile(lambda row: self._name_key(row).startswith(prefix), itertools.islice(order, start, None))
+        return self._pages(rows, page_size)
+
+    def search_tokens(self, query, page_size=50):
+        # Products whose name contains every word of query. The token index
+        # is built from the name column on first use.
+        if self._token_index is None:
+            index = {}
+            for row in range(self._count):
+                for token in set(re.findall(r"\w+", self._name_key(row))):
+                    rows = index.get(token)
+                    if rows is None:
+                        rows = index[token] = array('q')
+                    rows.append(row)
+            self._token_index = index
+        postings = [self._token_index.get(token, ()) for token in set(re.findall(r"\w+", query.casefold()))]
+        if not postings:
+            return self._pages((), page_size)
+        postings.sort(key=len)
+        rows = postings[0]
+        for other in postings[1:]:
+            other = set(other)
+            rows = [row for row in rows if row in other]
+        return self._pages(rows, page_size)
+
+    def price_range(self, low=None, high=None, page_size=50):
+        # Products with low <= price <= high (rupees), cheapest first.
+        order = self._price_order
+        key = self._price.__getitem__
+        start = bisect.bisect_left(order, _to_paise(low), key=key) if low is not None else 0
+        end = bisect.bisect_right(order, _to_paise(high), key=key) if high is not None else len(order)
+        return self._pages(itertools.islice(order, start, end), page_size)
+
+    def by_type(self, type_name, page_size=50):
+        # type_name is a to_dict() "type": product, physical or digital.
+        if self._type_index is None:
+            index = {name: array('q') for name in self.TYPE_NAMES}
+            for row, kind in enumerate(self._type):
+                index[self.TYPE_NAMES[kind]].append(row)
+            self._type_index = index
+        return self._pages(self._type_index.get(type_name, ()), page_size)
+
 class CartItem:
     def __init__(self, product, quantity):
         self._product = product
@@ -103,13 +384,13 @@ class CartItem:
         return self._quantity
 
     def set_quantity(self, value):
-        if value >= 0:
-            self._quantity = value
-        else:
-            print("Error: Cart item quantity cannot be negative.")
+        if value < 0:
+            return False
+        self._quantity = value
+        return True
 
     def calculate_subtotal(self):
-        return self._product.get_price() * self._quantity
+        return self._product._price * self._quantity / 100
 
     def __str__(self):
         return (f"Item: {self._product.get_name()}, Quantity: {self._quantity}, "
@@ -121,104 +402,603 @@ class CartItem:
             "quantity": self._quantity
         }
 
-class ShoppingCart:
-    def __init__(self):
-        self._items = {}
-        self.catalog = {}
+class Reservation:
+    # Stock held for one cart line. While ACTIVE its quantity is already
+    # taken out of the product's quantity_available.
+    ACTIVE, RELEASED, COMMITTED, EXPIRED = "active", "released", "committed", "expired"
 
-        self._initialize_dummy_catalog()
+    def __init__(self, product, quantity, expires_at, on_expire=None):
+        self._product = product
+        self._quantity = quantity
+        self._expires_at = expires_at
+        self._on_expire = on_expire
+        self._state = Reservation.ACTIVE
 
-    def _initialize_dummy_catalog(self):
-        print("Initializing with dummy products in memory...")
-        self.catalog['P1'] = PhysicalProduct('P1', 'Laptop', 65000.00, 10, 2.5)
-        self.catalog['P2'] = DigitalProduct('P2', 'E-Book Python Basics', 250.00, 100, 'http://demo1.com/python')
-        self.catalog['P3'] = Product('P3', 'Mouse', 150.00, 50)
-        self.catalog['P4'] = PhysicalProduct('P4', 'Keyboard', 750.00, 20, 1.0)
-        self.catalog['P5'] = DigitalProduct('P5', 'Software License', 199.99, 50, 'http://demo2.com/software')
+    def get_product(self):
+        return self._product
 
-    def add_item(self, product_id, quantity):
-        if not isinstance(quantity, int) or quantity <= 0:
-            print("Error: Quantity must be a positive integer.")
-            return False
+    def get_quantity(self):
+        return self._quantity
 
-        if product_id not in self.catalog:
-            print(f"Product with ID '{product_id}' not found in catalog.")
-            return False
+    def get_expires_at(self):
+        return self._expires_at
 
-        product = self.catalog[product_id]
+    def get_state(self):
+        return self._state
 
-        if product.get_quantity_available() < quantity:
-            print(f"Not enough stock for {product.get_name()}. Only {product.get_quantity_available()} available.")
-            return False
+class Inventory:
+    # Stock shared by any number of carts. Every stock change for a product
+    # happens under that product's lock stripe, so concurrent carts can
+    # never take more than is available. Reservations that are not
+    # committed within reservation_ttl seconds are expired by a background
+    # sweeper and their stock returned.
+    LOCK_STRIPES = 64
 
-        if product_id in self._items:
-            cart_item = self._items[product_id]
-            product.decrease_quantity(quantity)
-            cart_item.set_quantity(cart_item.get_quantity() + quantity)
-            print(f"Added {quantity} more of {product.get_name()} to cart.")
-        else:
-            product.decrease_quantity(quantity)
-            self._items[product_id] = CartItem(product, quantity)
-            print(f"Added {quantity} of {product.get_name()} to cart.")
+    def __init__(self, reservation_ttl=900.0, sweep_interval=1.0, lock_stripes=LOCK_STRIPES, clock=time.monotonic):
+        self.products = {}
+        self._reservation_ttl = reservation_ttl
+        self._clock = clock
+        self._locks = [threading.Lock() for _ in range(lock_stripes)]
+        self._expiry_lock = threading.Lock()
+        self._expiry_heap = []
+        self._expiry_seq = itertools.count()
+        self._stop = threading.Event()
+        self._sweeper = None
+        if sweep_interval is not None:
+            self._sweeper = threading.Thread(target=self._sweep, args=(sweep_interval,), daemon=True)
+            self._sweeper.start()
 
-        return True
+    def add_product(self, product):
+        self.products[product.get_product_id()] = product
 
-    def remove_item(self, product_id):
-        if product_id not in self._items:
-            print(f"Product with ID '{product_id}' not found in your cart.")
+    def _lock_for(self, product):
+        return self._locks[hash(product.get_product_id()) % len(self._locks)]
+
+    def _schedule(self, reservation):
+        with self._expiry_lock:
+            heapq.heappush(self._expiry_heap, (reservation._expires_at, next(self._expiry_seq), reservation))
+
+    def reserve(self, product_id, quantity, on_expire=None):
+        product = self.products.get(product_id)
+        if product is None or not isinstance(quantity, int) or quantity <= 0:
+            return None
+        with self._lock_for(product):
+            if product._quantity_available < quantity:
+                return None
+            product._quantity_available -= quantity
+            reservation = Reservation(product, quantity, self._clock() + self._reservation_ttl, on_expire)
+        self._schedule(reservation)
+        return reservation
+
+    def adjust(self, reservation, new_quantity):
+        # Grows or shrinks an active reservation and renews its TTL; a new
+        # quantity of 0 releases it.
+        if not isinstance(new_quantity, int) or new_quantity < 0:
             return False
+        if new_quantity == 0:
+            return self.release(reservation)
+        product = reservation._product
+        with self._lock_for(product):
+            if reservation._state != Reservation.ACTIVE:
+                return False
+            difference = new_quantity - reservation._quantity
+            if difference > product._quantity_available:
+                return False
+            product._quantity_available -= difference
+            reservation._quantity = new_quantity
+            reservation._expires_at = self._clock() + self._reservation_ttl
+        self._schedule(reservation)
+        return True
 
-        cart_item = self._items[product_id]
-        product = cart_item.get_product()
-        quantity_to_return = cart_item.get_quantity()
+    def release(self, reservation):
+        return self._finish(reservation, Reservation.RELEASED)
 
-        product.increase_quantity(quantity_to_return)
-        del self._items[product_id]
-        print(f"Removed {product.get_name()} from cart.")
+    def commit(self, reservation):
+        return self._finish(reservation, Reservation.COMMITTED)
 
+    def _finish(self, reservation, state):
+        product = reservation._product
+        with self._lock_for(product):
+            if reservation._state != Reservation.ACTIVE:
+                return False
+            if state != Reservation.COMMITTED:
+                product._quantity_available += reservation._quantity
+            reservation._state = state
         return True
 
+    def expire_due(self):
+        # Expires every active reservation whose TTL has passed; returns how
+        # many were expired. Heap entries superseded by adjust() are skipped.
+        now = self._clock()
+        expired = []
+        while True:
+            with self._expiry_lock:
+                if not self._expiry_heap or self._expiry_heap[0][0] > now:
+                    break
+                expires_at, _, reservation = heapq.heappop(self._expiry_heap)
+            if reservation._expires_at == expires_at and reservation._expires_at <= now:
+                if self._finish(reservation, Reservation.EXPIRED):
+                    expired.append(reservation)
+        for reservation in expired:
+            if reservation._on_expire is not None:
+                reservation._on_expire(reservation)
+        return len(expired)
+
+    def _sweep(self, interval):
+        while not self._stop.wait(interval):
+            self.expire_due()
+
+    def close(self):
+        self._stop.set()
+        if self._sweeper is not None:
+            self._sweeper.join()
+
+def _percent_of(paise, basis_points):
+    # Rounds half up to the nearest paisa.
+    return (paise * basis_points + 5000) // 10000
+
+class PricingRules:
+    # Collects discount, tax and shipping rules. Percentages are given as
+    # percent (12.5 means 12.5%) and money in rupees; compile() turns the
+    # rules into the lookup tables a PricingEngine prices carts with.
+    def __init__(self):
+        self._coupons = {}
+        self._bulk = {}
+        self._category = {}
+        self._tax = {}
+        self._default_tax = 0
+        self._shipping = []
+        self._shipping_per_kg = 0
+        self._free_shipping_over = None
+
+    def add_coupon(self, code, percent=0, amount=0, min_subtotal=0):
+        self._coupons[code.upper()] = (round(percent * 100), _to_paise(amount), _to_paise(min_subtotal))
+
+    def add_bulk_discount(self, product_id, min_quantity, percent):
+        # Tiers for one product; the highest tier reached applies.
+        self._bulk.setdefault(product_id, {})[min_quantity] = round(percent * 100)
+
+    def add_category_promotion(self, type_name, percent):
+        self._category[type_name] = round(percent * 100)
+
+    def set_tax_rate(self, percent, type_name=None):
+        if type_name is None:
+            self._default_tax = round(percent * 100)
+        else:
+            self._tax[type_name] = round(percent * 100)
+
+    def add_shipping_slab(self, max_weight_kg, charge):
+        self._shipping.append((round(max_weight_kg * 1000), _to_paise(charge)))
+
+    def set_shipping_overflow(self, per_kg=0, free_over=None):
+        # per_kg is charged for every started kilogram above the last slab;
+        # orders whose discounted subtotal reaches free_over ship free.
+        self._shipping_per_kg = _to_paise(per_kg)
+        self._free_shipping_over = None if free_over is None else _to_paise(free_over)
+
+    def compile(self):
+        return PricingEngine(self)
+
+class PricingEngine:
+    # Compiled, read-only pricing tables. A line is priced with a couple of
+    # dict lookups and one bisect, whatever the number of rules, and
+    # engines can be shared between any number of carts.
+    def __init__(self, rules):
+        self._coupons = dict(rules._coupons)
+        self._bulk = {}
+        for product_id, tiers in rules._bulk.items():
+            thresholds = sorted(tiers)
+            self._bulk[product_id] = (array("q", thresholds), array("q", [tiers[t] for t in thresholds]))
+        self._category = dict(rules._category)
+        self._tax = dict(rules._tax)
+        self._default_tax = rules._default_tax
+        slabs = sorted(rules._shipping)
+        self._shipping_limits = array("q", [limit for limit, _ in slabs])
+        self._shipping_charges = array("q", [charge for _, charge in slabs])
+        self._shipping_per_kg = rules._shipping_per_kg
+        self._free_shipping_over = rules._free_shipping_over
+
+    def has_coupon(self, code):
+        return code.upper() in self._coupons
+
+    def price_line(self, product, quantity):
+        # Returns (gross, discount, tax rate) for one cart line, in paise
+        # and basis points. Bulk tiers and category promotions do not
+        # stack; the larger discount wins.
+        gross = product._price * quantity
+        rate = self._category.get(product._type_name, 0)
+        tiers = self._bulk.get(product._product_id)
+        if tiers is not None:
+            index = bisect.bisect_right(tiers[0], quantity) - 1
+            if index >= 0 and tiers[1][index] > rate:
+                rate = tiers[1][index]
+        return gross, _percent_of(gross, rate), self._tax.get(product._type_name, self._default_tax)
+
+    def coupon_discount(self, code, subtotal):
+        rule = self._coupons.get(code.upper()) if code else None
+        if rule is None or subtotal < rule[2]:
+            return 0
+        return min(subtotal, _percent_of(subtotal, rule[0]) + rule[1])
+
+    def shipping(self, weight_grams, subtotal):
+        if weight_grams <= 0 or not self._shipping_limits:
+            return 0
+        if self._free_shipping_over is not None and subtotal >= self._free_shipping_over:
+            return 0
+        index = bisect.bisect_left(self._shipping_limits, weight_grams)
+        if index < len(self._shipping_limits):
+            return self._shipping_charges[index]
+        extra_kg = -(-(weight_grams - self._shipping_limits[-1]) // 1000)
+        return self._shipping_charges[-1] + extra_kg * self._shipping_per_kg
+
+    def cart_state(self):
+        return _CartPricing(self)
+
+class _CartPricing:
+    # Per-cart running sums kept up to date by ShoppingCart._adjust_totals,
+    # so a quote costs O(tax rates) instead of a walk over the cart.
+    def __init__(self, engine):
+        self._engine = engine
+        self.reset()
+
+    def reset(self):
+        self._lines = {}
+        self._gross = 0
+        self._discount = 0
+        self._net_by_rate = {}
+        self.coupon = None
+
+    def line_changed(self, product, quantity):
+        product_id = product._product_id
+        old = self._lines.pop(product_id, None)
+        if old is not None:
+            self._gross -= old[0]
+            self._discount -= old[1]
+            self._net_by_rate[old[2]] -= old[0] - old[1]
+        if quantity > 0:
+            gross, discount, rate = self._engine.price_line(product, quantity)
+            self._lines[product_id] = (gross, discount, rate)
+            self._gross += gross
+            self._discount += discount
+            self._net_by_rate[rate] = self._net_by_rate.get(rate, 0) + gross - discount
+
+    def quote(self, weight_grams):
+        engine = self._engine
+        net = self._gross - self._discount
+        coupon = engine.coupon_discount(self.coupon, net)
+        # The coupon is spread over the tax rates in proportion to the
+        # amount charged at each.
+        tax = 0
+        for rate, amount in self._net_by_rate.items():
+            if amount:
+                tax += _percent_of(amount - coupon * amount // net, rate)
+        taxable = net - coupon
+        shipping = engine.shipping(weight_grams, taxable)
+        return _breakdown(self._gross, self._discount, coupon, tax, shipping)
+
+def _breakdown(subtotal, discount, coupon, tax, shipping):
+    return {
+        "subtotal": subtotal / 100,
+        "discount": discount / 100,
+        "coupon": coupon / 100,
+        "tax": tax / 100,
+        "shipping": shipping / 100,
+        "total": (subtotal - discount - coupon + tax + shipping) / 100,
+    }
+
+CartChange = namedtuple("CartChange", "index op product_id previous quantity error")
+
+class CartChangeReport:
+    # Outcome of ShoppingCart.apply_changes: one CartChange per operation,
+    # with the line quantity before and after it. If any operation has an
+    # error, nothing was applied.
+    def __init__(self):
+        self.applied = False
+        self.changes = []
+
+    @property
+    def errors(self):
+        return [change for change in self.changes if change.error is not None]
+
+    def fail(self, index, error):
+        self.changes[index] = self.changes[index]._replace(error=error)
+
+    def __bool__(self):
+        return self.applied
+
+    def __repr__(self):
+        return f"CartChangeReport(applied={self.applied}, errors={len(self.errors)})"
+
+class ShoppingCart:
+    # Messages for the single-item methods go to echo (e.g. print) when one
+    # is given; the cart itself never prints.
+    def __init__(self, inventory=None, pricing=None, echo=None):
+        self._items = {}
+        self._reservations = {}
+        # Running totals kept in step by every mutator: paise, units, grams.
+        self._total = 0
+        self._item_count = 0
+        self._total_weight = 0
+        # Guards the cart against the inventory's expiry thread.
+        self._lock = threading.RLock()
+        self._pricing = pricing.cart_state() if pricing is not None else None
+        self._echo = echo
+
+        # A cart without a shared inventory gets a private one with no
+        # sweeper thread: nothing else competes for its stock, and an
+        # unclosed thread per cart would leak.
+        self._inventory = inventory if inventory is not None else Inventory(sweep_interval=None)
+        self.catalog = self._inventory.products
+        if inventory is None:
+            self._initialize_dummy_catalog()
+
+    def _initialize_dummy_catalog(self):
+        if self._echo is not None:
+            self._echo("Initializing with dummy products in memory...")
+        self._inventory.add_product(PhysicalProduct('P1', 'Laptop', 65000.00, 10, 2.5))
+        self._inventory.add_product(DigitalProduct('P2', 'E-Book Python Basics', 250.00, 100, 'http://demo1.com/python'))
+        self._inventory.add_product(Product('P3', 'Mouse', 150.00, 50))
+        self._inventory.add_product(PhysicalProduct('P4', 'Keyboard', 750.00, 20, 1.0))
+        self._inventory.add_product(DigitalProduct('P5', 'Software License', 199.99, 50, 'http://demo2.com/software'))
+
+    def _adjust_totals(self, product, quantity_delta):
+        self._total += product._price * quantity_delta
+        self._item_count += quantity_delta
+        self._total_weight += product._weight_grams * quantity_delta
+        if self._pricing is not None:
+            item = self._items.get(product._product_id)
+            self._pricing.line_changed(product, item.get_quantity() if item is not None else 0)
+
+    def _on_reservation_expired(self, reservation):
+        product = reservation.get_product()
+        product_id = product.get_product_id()
+        with self._lock:
+            if self._reservations.get(product_id) is reservation:
+                del self._reservations[product_id]
+                del self._items[product_id]
+                self._adjust_totals(product, -reservation.get_quantity())
+
+    def add_item(self, product_id, quantity):
+        return self._apply_one(("add", product_id, quantity))
+
+    def remove_item(self, product_id):
+        return self._apply_one(("remove", product_id))
+
     def update_quantity(self, product_id, new_quantity):
-        if not isinstance(new_quantity, int) or new_quantity < 0:
-            print("Error: New quantity must be a non-negative integer.")
-            return False
+        return self._apply_one(("update", product_id, new_quantity))
 
-        if product_id not in self._items:
-            print(f"Product with ID '{product_id}' not found in your cart.")
-            return False
+    def _apply_one(self, op):
+        report = self.apply_changes([op])
+        if self._echo is not None:
+            for change in report.changes:
+                self._echo(self.describe_change(change))
+        return report.applied
 
-        cart_item = self._items[product_id]
-        product = cart_item.get_product()
-        old_quantity = cart_item.get_quantity()
+    def apply_changes(self, ops):
+        # Applies a batch of ("add", product_id, quantity), ("remove",
+        # product_id) and ("update", product_id, quantity) operations all or
+        # nothing. The whole batch is validated against the cart and the
+        # stock first; then each touched line is reserved once for its final
+        # quantity. Nothing is printed; see describe_change(). An operation
+        # that is not such a tuple gets a "malformed" change.
+        report = CartChangeReport()
+        with self._lock:
+            targets = {}
+            last_change = {}
+            for index, op in enumerate(ops):
+                try:
+                    if not isinstance(op, (tuple, list)):
+                        raise TypeError(op)
+                    kind, product_id = op[0], op[1]
+                    hash(product_id)
+                except (IndexError, TypeError):
+                    report.changes.append(CartChange(index, None, None, 0, 0, "malformed"))
+                    continue
+                current = targets[product_id] if product_id in targets else self._line_quantity(product_id)
+                quantity = op[2] if len(op) > 2 else 0
+                error, new = None, current
+                if kind == "add":
+                    if not isinstance(quantity, int) or quantity <= 0:
+                        error = "invalid_quantity"
+                    elif product_id not in self.catalog:
+                        error = "unknown_product"
+                    else:
+                        new = current + quantity
+                elif kind == "remove" or kind == "update":
+                    if kind == "update" and (not isinstance(quantity, int) or quantity < 0):
+                        error = "invalid_quantity"
+                    elif current == 0:
+                        error = "not_in_cart"
+                    else:
+                        new = quantity if kind == "update" else 0
+                else:
+                    error = "unknown_op"
+                report.changes.append(CartChange(index, kind, product_id, current, new, error))
+                if error is None:
+                    targets[product_id] = new
+                    last_change[product_id] = index
 
-        if new_quantity == old_quantity:
-            print(f"Quantity for {product.get_name()} is already {new_quantity}.")
-            return True
+            increases = []
+            decreases = []
+            for product_id, target in targets.items():
+                held = self._line_quantity(product_id)
+                if target > held:
+                    if target - held > self.catalog[product_id]._quantity_available:
+                        report.fail(last_change[product_id], "insufficient_stock")
+                    increases.append((product_id, held, target))
+                elif target < held:
+                    decreases.append((product_id, held, target))
+            if report.errors:
+                return report
 
-        quantity_difference = new_quantity - old_quantity
+            # Increases can still lose a race with another cart for the
+            # stock, so they go first and are rolled back on failure;
+            # decreases only hand stock back.
+            done = []
+            for product_id, held, target in increases:
+                if not self._set_line(product_id, held, target):
+                    report.fail(last_change[product_id], "insufficient_stock")
+                    for undo_id, undo_held, undo_target in reversed(done):
+                        self._set_line(undo_id, undo_target, undo_held)
+                    return report
+                done.append((product_id, held, target))
+            for product_id, held, target in decreases:
+                self._set_line(product_id, held, target)
+            report.applied = True
+        return report
 
-        if quantity_difference > 0:
-            if product.get_quantity_available() < quantity_difference:
-                print(f"Not enough stock for {product.get_name()}. Only {product.get_quantity_available()} more available.")
-                return False
-            product.decrease_quantity(quantity_difference)
-        elif quantity_difference < 0:
-            product.increase_quantity(abs(quantity_difference))
+    def _line_quantity(self, product_id):
+        item = self._items.get(product_id)
+        return item.get_quantity() if item is not None else 0
 
-        if new_quantity == 0:
-            del self._items[product_id]
-            print(f"Quantity for {product.get_name()} updated to 0. Item removed from cart.")
+    def _set_line(self, product_id, held, target):
+        # Moves one line from held to target units, reserving or releasing
+        # stock to match. Returns False if the stock is not there.
+        if held == 0:
+            reservation = self._inventory.reserve(product_id, target, self._on_reservation_expired)
+            if reservation is None:
+                return False
+            product = reservation.get_product()
+            self._reservations[product_id] = reservation
+            self._items[product_id] = CartItem(product, target)
+        elif target == 0:
+            product = self._items.pop(product_id).get_product()
+            self._inventory.release(self._reservations.pop(product_id))
         else:
-            cart_item.set_quantity(new_quantity)
-            print(f"Quantity for {product.get_name()} updated to {new_quantity}.")
+            if not self._inventory.adjust(self._reservations[product_id], target):
+                return False
+            product = self._items[product_id].get_product()
+            self._items[product_id].set_quantity(target)
+        self._adjust_totals(product, target - held)
+        return True
 
+    def describe_change(self, change):
+        # The menu's message for one CartChange.
+        product = self.catalog.get(change.product_id)
+        name = product.get_name() if product is not None else change.product_id
+        if change.error == "invalid_quantity":
+            if change.op == "add":
+                return "Error: Quantity must be a positive integer."
+            return "Error: New quantity must be a non-negative integer."
+        if change.error == "unknown_product":
+            return f"Product with ID '{change.product_id}' not found in catalog."
+        if change.error == "not_in_cart":
+            return f"Product with ID '{change.product_id}' not found in your cart."
+        if change.error == "malformed":
+            return f"Cart operation {change.index + 1} is malformed."
+        if change.error == "insufficient_stock":
+            more = " more" if change.op == "update" else ""
+            return f"Not enough stock for {name}. Only {product.get_quantity_available()}{more} available."
+        if change.error is not None:
+            return f"Unknown cart operation '{change.op}'."
+        if change.op == "add":
+            more = " more" if change.previous else ""
+            return f"Added {change.quantity - change.previous}{more} of {name} to cart."
+        if change.op == "remove":
+            return f"Removed {name} from cart."
+        if change.quantity == change.previous:
+            return f"Quantity for {name} is already {change.quantity}."
+        if change.quantity == 0:
+            return f"Quantity for {name} updated to 0. Item removed from cart."
+        return f"Quantity for {name} updated to {change.quantity}."
+
+    def apply_coupon(self, code):
+        # Returns False if there is no pricing engine or it does not know
+        # the code; the coupon's minimum subtotal is checked when pricing.
+        if self._pricing is None or not self._pricing._engine.has_coupon(code):
+            return False
+        with self._lock:
+            self._pricing.coupon = code.upper()
         return True
 
+    def quote(self):
+        # Price breakdown in rupees: subtotal, discount, coupon, tax,
+        # shipping and total. Without a pricing engine only the subtotal
+        # is charged.
+        with self._lock:
+            if self._pricing is None:
+                return _breakdown(self._total, 0, 0, 0, 0)
+            return self._pricing.quote(self._total_weight)
+
+    def to_dict(self):
+        with self._lock:
+            data = {"items": [item.to_dict() for item in self._items.values()]}
+            if self._pricing is not None and self._pricing.coupon:
+                data["coupon"] = self._pricing.coupon
+            return data
+
+    @classmethod
+    def from_dict(cls, data, inventory, pricing=None):
+        # Lines are reserved again against inventory; lines that can no
+        # longer be reserved in full are left out.
+        cart = cls(inventory, pricing)
+        for item in data.get("items", ()):
+            product_id, quantity = item["product_id"], item["quantity"]
+            reservation = inventory.reserve(product_id, quantity, cart._on_reservation_expired)
+            if reservation is not None:
+                product = reservation.get_product()
+                cart._reservations[product_id] = reservation
+                cart._items[product_id] = CartItem(product, quantity)
+                cart._adjust_totals(product, quantity)
+        if data.get("coupon"):
+            cart.apply_coupon(data["coupon"])
+        return cart
+
+    def clear(self):
+        # Empties the cart and hands every reserved unit back to the stock.
+        with self._lock:
+            for reservation in self._reservations.values():
+                self._inventory.release(reservation)
+            self._reset()
+
+    def _reset(self):
+        self._reservations.clear()
+        self._items.clear()
+        self._total = self._item_count = self._total_weight = 0
+        if self._pricing is not None:
+            self._pricing.reset()
+
+    def checkout(self):
+        # Commits every reservation (the stock is sold), empties the cart
+        # and returns the quote() breakdown that was charged, with the sold
+        # lines under "lines". A line whose reservation expired a moment
+        # ago is dropped, not charged.
+        with self._lock:
+            for product_id, reservation in list(self._reservations.items()):
+                if not self._inventory.commit(reservation):
+                    del self._reservations[product_id]
+                    del self._items[product_id]
+                    self._adjust_totals(reservation.get_product(), -reservation.get_quantity())
+            breakdown = self.quote()
+            breakdown["lines"] = [
+                {"product_id": product_id, "quantity": item.get_quantity(), "price": item.get_product().get_price()}
+                for product_id, item in self._items.items()
+            ]
+            self._reset()
+        return breakdown
+
     def get_total(self):
-        total = 0.0
+        return self._total / 100
+
+    def get_item_count(self):
+        return self._item_count
+
+    def get_total_weight(self):
+        return self._total_weight / 1000
+
+    def _scan_totals(self):
+        total = count = weight = 0
         for item in self._items.values():
-            total += item.calculate_subtotal()
-        return total
+            product, quantity = item.get_product(), item.get_quantity()
+            total += product._price * quantity
+            count += quantity
+            weight += product._weight_grams * quantity
+        return total, count, weight
+
+    def check_consistency(self):
+        # Recomputes the totals with a full scan of the cart lines and
+        # compares them with the running ones.
+        return self._scan_totals() == (self._total, self._item_count, self._total_weight)
 
     def display_cart(self):
         print("\n--- Your Shopping Cart ---")
@@ -243,52 +1023,432 @@ class ShoppingCart:
             print(product.display_details())
         print("--------------------------")
 
-cart = ShoppingCart()
-
-while True:
-    print("\n--- Shopping Cart Menu ---")
-    print("1. View Products")
-    print("2. Add Item to Cart")
-    print("3. View Cart")
-    print("4. Update Quantity in Cart")
-    print("5. Remove Item from Cart")
-    print("6. Checkout")
-    print("7. Exit")
-    print("--------------------------")
-
-    choice = input("Enter your choice: ")
-
-    if choice == '1':
-        cart.display_products()
-    elif choice == '2':
-        product_id = input("Enter Product ID to add: ").strip().upper()
-        quantity_str = input("Enter quantity: ")
-        
-        if quantity_str.isdigit():
-            quantity = int(quantity_str)
-            cart.add_item(product_id, quantity)
+class CartSessionStore:
+    # Live ShoppingCarts keyed by session id, all sharing one Inventory.
+    # At most capacity carts stay in memory; the least recently used one
+    # is then spilled to a dbm file at spill_path as its (product_id,
+    # quantity) pairs and coupon and reloaded on its next get(). A spilled cart gives
+    # its reserved stock back, and on reload lines that can no longer be
+    # reserved in full are dropped.
+    #
+    # Spilling empties the in-memory cart, so a cart from get() must not be
+    # kept while other sessions are looked up: edits to it after it has
+    # been spilled are lost, and their stock stays reserved until the
+    # TTL. Hold it with `with store.session(session_id) as cart:` instead;
+    # a cart in use there is never spilled (the store may briefly exceed
+    # capacity until it is given back).
+    def __init__(self, inventory, spill_path, capacity=10000, pricing=None):
+        self._inventory = inventory
+        self._pricing = pricing
+        self._capacity = capacity
+        self._sessions = OrderedDict()
+        self._pinned = {}
+        self._spilled = dbm.open(spill_path, "c")
+        self._spilled_count = len(self._spilled)
+        self._lock = threading.Lock()
+        self._hits = self._misses = self._evictions = self._reloads = 0
+
+    def get(self, session_id, create=True):
+        with self._lock:
+            return self._get(session_id, create, False)
+
+    @contextmanager
+    def session(self, session_id, create=True):
+        # Yields the session's cart (None if unknown and not create) and
+        # keeps it in memory until the block ends.
+        with self._lock:
+            cart = self._get(session_id, create, True)
+        try:
+            yield cart
+        finally:
+            if cart is not None:
+                with self._lock:
+                    if self._pinned[session_id] == 1:
+                        del self._pinned[session_id]
+                    else:
+                        self._pinned[session_id] -= 1
+                    self._evict_over_capacity()
+
+    def _get(self, session_id, create, pin):
+        # A pinned cart is pinned before anything is spilled to make room.
+        cart = self._sessions.get(session_id)
+        if cart is not None:
+            self._sessions.move_to_end(session_id)
+            self._hits += 1
+            if pin:
+                self._pinned[session_id] = self._pinned.get(session_id, 0) + 1
+            return cart
+        self._misses += 1
+        key = session_id.encode()
+        if key in self._spilled:
+            pairs, coupon = json.loads(self._spilled[key])
+            del self._spilled[key]
+            self._spilled_count -= 1
+            data = {"items": [{"product_id": p, "quantity": q} for p, q in pairs], "coupon": coupon}
+            cart = ShoppingCart.from_dict(data, self._inventory, self._pricing)
+            self._reloads += 1
+        elif create:
+            cart = ShoppingCart(self._inventory, self._pricing)
         else:
-            print("Invalid quantity. Please enter a whole number.")
-    elif choice == '3':
-        cart.display_cart()
-    elif choice == '4':
-        product_id = input("Enter Product ID to update: ").strip().upper()
-        new_quantity_str = input("Enter new quantity: ")
-
-        if new_quantity_str.isdigit():
-            new_quantity = int(new_quantity_str)
-            cart.update_quantity(product_id, new_quantity)
+            return None
+        self._sessions[session_id] = cart
+        if pin:
+            self._pinned[session_id] = self._pinned.get(session_id, 0) + 1
+        self._evict_over_capacity()
+        return cart
+
+    def _evict_over_capacity(self):
+        # Spills the least recently used carts that are not in use until
+        # the store is back within capacity (or only carts in use are left).
+        excess = len(self._sessions) - self._capacity
+        if excess <= 0:
+            return
+        victims = []
+        for session_id in self._sessions:
+            if session_id not in self._pinned:
+                victims.append(session_id)
+                if len(victims) == excess:
+                    break
+        for session_id in victims:
+            self._evict(session_id)
+
+    def _evict(self, session_id):
+        cart = self._sessions.pop(session_id)
+        data = cart.to_dict()
+        pairs = [(item["product_id"], item["quantity"]) for item in data["items"]]
+        if pairs:
+            self._spilled[session_id.encode()] = json.dumps([pairs, data.get("coupon")], separators=(",", ":"))
+            self._spilled_count += 1
+        cart.clear()
+        self._evictions += 1
+
+    def drop(self, session_id):
+        # Ends a session, releasing its stock; returns False if unknown.
+        with self._lock:
+            cart = self._sessions.pop(session_id, None)
+            if cart is not None:
+                cart.clear()
+                return True
+            key = session_id.encode()
+            if key in self._spilled:
+                del self._spilled[key]
+                self._spilled_count -= 1
+                return True
+            return False
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def metrics(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            sample = list(itertools.islice(reversed(self._sessions.values()), 100))
+            return {
+                "resident": len(self._sessions),
+                "spilled": self._spilled_count,
+                "in_use": len(self._pinned),
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+                "evictions": self._evictions,
+                "reloads": self._reloads,
+                "bytes_per_session": sum(map(_cart_footprint, sample)) / len(sample) if sample else 0,
+            }
+
+    def close(self):
+        with self._lock:
+            self._spilled.close()
+
+class OrderLog:
+    # Append-only JSON Lines file of placed orders and their fulfilments.
+    # Each order carries the caller's idempotency key, so retrying a
+    # checkout with the same key returns the recorded order instead of
+    # charging again. Opening the log rebuilds the key index and the list
+    # of orders still waiting for fulfilment; a torn last line left by a
+    # crash is cut off.
+    def __init__(self, path, fsync=True):
+        self._fsync = fsync
+        self._lock = threading.Lock()
+        self._orders = {}
+        self._by_key = {}
+        self._fulfilled = set()
+        self._inflight = {}
+        good = 0
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break
+                    good += len(line)
+                    if "fulfilled" in record:
+                        self._fulfilled.add(record["order_id"])
+                    else:
+                        self._orders[record["order_id"]] = record
+                        self._by_key[record["idempotency_key"]] = record["order_id"]
+        self._file = open(path, "ab")
+        self._file.truncate(good)
+        self._next_order = len(self._orders) + 1
+
+    def _append(self, record):
+        self._file.write(json.dumps(record, separators=(",", ":")).encode() + b"\n")
+        self._file.flush()
+        if self._fsync:
+            os.fsync(self._file.fileno())
+
+    def place_order(self, cart, idempotency_key):
+        # Checks cart out and records the order; returns the order record,
+        # or None for an empty cart. A duplicate key gets the first order
+        # back, waiting for it if that checkout is still in progress.
+        with self._lock:
+            order_id = self._by_key.get(idempotency_key)
+            if order_id is not None:
+                return self._orders[order_id]
+            pending = self._inflight.get(idempotency_key)
+            if pending is None:
+                self._inflight[idempotency_key] = threading.Event()
+        if pending is not None:
+            pending.wait()
+            with self._lock:
+                order_id = self._by_key.get(idempotency_key)
+                return self._orders[order_id] if order_id is not None else None
+
+        try:
+            breakdown = cart.checkout()
+            with self._lock:
+                if not breakdown["lines"]:
+                    return None
+                order = {
+                    "order_id": f"O{self._next_order}",
+                    "idempotency_key": idempotency_key,
+                    "placed_at": time.time(),
+                    "lines": breakdown.pop("lines"),
+                    "charges": breakdown,
+                }
+                self._next_order += 1
+                self._append(order)
+                self._orders[order["order_id"]] = order
+                self._by_key[idempotency_key] = order["order_id"]
+                return order
+        finally:
+            with self._lock:
+                self._inflight.pop(idempotency_key).set()
+
+    def record_fulfillment(self, order_id, entitlements, manifest):
+        with self._lock:
+            self._append({"fulfilled": time.time(), "order_id": order_id,
+                          "entitlements": entitlements, "manifest": manifest})
+            self._fulfilled.add(order_id)
+
+    def get(self, order_id):
+        return self._orders.get(order_id)
+
+    def is_fulfilled(self, order_id):
+        with self._lock:
+            return order_id in self._fulfilled
+
+    def pending(self):
+        with self._lock:
+            return [order for order_id, order in self._orders.items() if order_id not in self._fulfilled]
+
+    def __len__(self):
+        return len(self._orders)
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+class CheckoutPipeline:
+    # Places orders in an OrderLog and fulfils them on a pool of worker
+    # threads: DigitalProduct lines get download entitlements, everything
+    # else goes on a shipping manifest. The work queue is bounded, so when
+    # the workers fall behind checkout() blocks (or raises queue.Full once
+    # timeout runs out) instead of letting the backlog grow. An order whose
+    # put timed out stays recorded but unqueued; retrying checkout() with
+    # the same key queues it then. Orders left unfulfilled by an earlier
+    # run are queued again on start-up. An order whose fulfilment (or
+    # on_fulfilled callback) raises is passed to on_error(order, error), or
+    # printed to stderr, and the worker goes on with the next one; if it
+    # was not recorded as fulfilled, retrying its checkout queues it again.
+    def __init__(self, order_log, catalog, workers=4, queue_size=256, on_fulfilled=None, on_error=None):
+        self._log = order_log
+        self._catalog = catalog
+        self._on_fulfilled = on_fulfilled
+        self._on_error = on_error
+        self._queue = queue.Queue(queue_size)
+        self._lock = threading.Lock()
+        self._queued = set()
+        self._workers = [threading.Thread(target=self._work, daemon=True) for _ in range(workers)]
+        for worker in self._workers:
+            worker.start()
+        for order in order_log.pending():
+            self._enqueue(order)
+
+    def checkout(self, cart, idempotency_key, timeout=None):
+        order = self._log.place_order(cart, idempotency_key)
+        if order is not None:
+            self._enqueue(order, timeout)
+        return order
+
+    def _enqueue(self, order, timeout=None):
+        # Queues order unless it is already queued or fulfilled; a put that
+        # times out leaves it unqueued so a retry can try again.
+        order_id = order["order_id"]
+        with self._lock:
+            if order_id in self._queued or self._log.is_fulfilled(order_id):
+                return
+            self._queued.add(order_id)
+        try:
+            self._queue.put(order, timeout=timeout)
+        except queue.Full:
+            with self._lock:
+                self._queued.discard(order_id)
+            raise
+
+    def _work(self):
+        while True:
+            order = self._queue.get()
+            if order is None:
+                self._queue.task_done()
+                return
+            try:
+                self._fulfil(order)
+            except Exception as error:
+                with self._lock:
+                    self._queued.discard(order["order_id"])
+                self._report(order, error)
+            finally:
+                self._queue.task_done()
+
+    def _report(self, order, error):
+        if self._on_error is not None:
+            try:
+                self._on_error(order, error)
+                return
+            except Exception as handler_error:
+                error = handler_error
+        print(f"Fulfilling order {order['order_id']} failed:", file=sys.stderr)
+        traceback.print_exception(error)
+
+    def _fulfil(self, order):
+        entitlements = []
+        manifest = []
+        for line in order["lines"]:
+            product = self._catalog.get(line["product_id"])
+            if isinstance(product, DigitalProduct):
+                entitlements.append({
+                    "product_id": line["product_id"],
+                    "download_link": product.get_download_link(),
+                    "token": secrets.token_urlsafe(16),
+                    "quantity": line["quantity"],
+                })
+            else:
+                weight = product._weight_grams if product is not None else 0
+                manifest.append({
+                    "product_id": line["product_id"],
+                    "quantity": line["quantity"],
+                    "weight_grams": weight * line["quantity"],
+                })
+        self._log.record_fulfillment(order["order_id"], entitlements, manifest)
+        with self._lock:
+            self._queued.discard(order["order_id"])
+        if self._on_fulfilled is not None:
+            self._on_fulfilled(order, entitlements, manifest)
+
+    def join(self):
+        # Waits until every queued order has been fulfilled.
+        self._queue.join()
+
+    def close(self):
+        for _ in self._workers:
+            self._queue.put(None)
+        for worker in self._workers:
+            worker.join()
+
+def _cart_footprint(cart):
+    # Approximate resident bytes of one cart: the cart, its containers and
+    # its lines, but not the shared products.
+    size = sys.getsizeof(cart) + sys.getsizeof(cart.__dict__) + sys.getsizeof(cart._lock)
+    size += sys.getsizeof(cart._items) + sys.getsizeof(cart._reservations)
+    for item in cart._items.values():
+        size += sys.getsizeof(item) + sys.getsizeof(item.__dict__)
+    for reservation in cart._reservations.values():
+        size += sys.getsizeof(reservation) + sys.getsizeof(reservation.__dict__)
+    return size
+
+def run_menu(cart, checkout_pipeline):
+    while True:
+        print("\n--- Shopping Cart Menu ---")
+        print("1. View Products")
+        print("2. Add Item to Cart")
+        print("3. View Cart")
+        print("4. Update Quantity in Cart")
+        print("5. Remove Item from Cart")
+        print("6. Checkout")
+        print("7. Exit")
+        print("--------------------------")
+
+        choice = input("Enter your choice: ")
+
+        if choice == '1':
+            cart.display_products()
+        elif choice == '2':
+            product_id = input("Enter Product ID to add: ").strip().upper()
+            quantity_str = input("Enter quantity: ")
+
+            if quantity_str.isdigit():
+                quantity = int(quantity_str)
+                cart.add_item(product_id, quantity)
+            else:
+                print("Invalid quantity. Please enter a whole number.")
+        elif choice == '3':
+            cart.display_cart()
+        elif choice == '4':
+            product_id = input("Enter Product ID to update: ").strip().upper()
+            new_quantity_str = input("Enter new quantity: ")
+
+            if new_quantity_str.isdigit():
+                new_quantity = int(new_quantity_str)
+                cart.update_quantity(product_id, new_quantity)
+            else:
+                print("Invalid quantity. Please enter a whole number.")
+        elif choice == '5':
+            product_id = input("Enter Product ID to remove: ").strip().upper()
+            cart.remove_item(product_id)
+        elif choice == '6':
+            print("\n--- Checkout ---")
+            order = checkout_pipeline.checkout(cart, uuid.uuid4().hex)
+            if order is None:
+                print("Your cart is empty.")
+                continue
+            breakdown = order["charges"]
+            for label in ("subtotal", "discount", "coupon", "tax", "shipping"):
+                if breakdown[label]:
+                    print(f"{label.capitalize():<10} ₹{breakdown[label]:.2f}")
+            print(f"Your total is: ₹{breakdown['total']:.2f}")
+            print(f"Order {order['order_id']} placed.")
+            print("Thank you for your purchase, Visit Again!")
+        elif choice == '7':
+            print("Exiting Shopping Cart. Goodbye!")
+            break
         else:
-            print("Invalid quantity. Please enter a whole number.")
-    elif choice == '5':
-        product_id = input("Enter Product ID to remove: ").strip().upper()
-        cart.remove_item(product_id)
-    elif choice == '6':
-        print("\n--- Checkout ---")
-        print(f"Your total is: ₹{cart.get_total():.2f}")
-        print("Thank you for your purchase, Visit Again!")
-    elif choice == '7':
-        print("Exiting Shopping Cart. Goodbye!")
-        break
-    else:
-        print("Invalid choice. Please try again.")
+            print("Invalid choice. Please try again.")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Online shopping cart")
+    parser.add_argument("--orders", default="orders.jsonl", help="append placed orders to this order log")
+    args = parser.parse_args(argv)
+
+    cart = ShoppingCart(echo=print)
+    order_log = OrderLog(args.orders)
+    checkout_pipeline = CheckoutPipeline(order_log, cart.catalog, workers=1)
+    try:
+        run_menu(cart, checkout_pipeline)
+    finally:
+        checkout_pipeline.close()
+        order_log.close()
+        cart._inventory.close()
+
+if __name__ == "__main__":
+    main()
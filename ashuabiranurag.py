@@ -1,7 +1,118 @@
+import argparse
+import asyncio
+import bisect
+import csv
+import gc
+import itertools
+import json
+import math
+import mmap
+import multiprocessing
+import os
+import shutil
+import re
+import struct
+import sys
+import threading
+import time
+import zlib
+from array import array
+from collections import namedtuple
+from contextlib import contextmanager
+
+def _interest_growth(rate, compounding_periods):
+    # interest_rate is the rate for one interest run; it is compounded
+    # compounding_periods times within that run (e.g. 30 for daily
+    # compounding of a monthly rate). One period keeps the plain rate.
+    if compounding_periods == 1:
+        return rate
+    return (1 + rate / compounding_periods) ** compounding_periods - 1
+
+# \w is exactly str.isalnum() plus "_", the rule add_customer always used.
+_CUSTOMER_ID = re.compile(r"\w+")
+
+ImportReject = namedtuple("ImportReject", "row customer_id reason")
+
+def _customer_fields(row):
+    # (customer_id, name, address) from an import row, or None unless it is
+    # a three-item sequence whose name and address are strings.
+    if isinstance(row, (str, bytes, dict)):
+        return None
+    try:
+        fields = tuple(row)
+    except TypeError:
+        return None
+    if len(fields) != 3 or not isinstance(fields[1], str) or not isinstance(fields[2], str):
+        return None
+    return fields
+
+def _first_field(row):
+    # The customer id to report for a malformed row, if one can be told.
+    if isinstance(row, (list, tuple)) and row:
+        return row[0]
+    return None
+
+class ImportReport:
+    # Outcome of a bulk customer import. Every reject is counted, but only
+    # the first max_rejects are kept so memory stays flat on bad input.
+    def __init__(self, max_rejects=1000):
+        self.added = 0
+        self.rejected = 0
+        self.rejects = []
+        self._max_rejects = max_rejects
+    def reject(self, row, customer_id, reason):
+        self.rejected += 1
+        if len(self.rejects) < self._max_rejects:
+            self.rejects.append(ImportReject(row, customer_id, reason))
+    def __repr__(self):
+        return f"ImportReport(added={self.added}, rejected={self.rejected})"
+
+@contextmanager
+def _holding(locks):
+    for lock in locks:
+        lock.acquire()
+    try:
+        yield
+    finally:
+        for lock in reversed(locks):
+            lock.release()
+
+def _account_terms(account_type, initial_balance, options):
+    # (opening balance, interest rate or overdraft limit) as floats, or None
+    # for an unknown account type or a value that is not a finite number.
+    if account_type == "savings":
+        option = options.get("interest_rate", 0.01)
+    elif account_type == "checking":
+        option = options.get("overdraft_limit", 0.0)
+    else:
+        return None
+    try:
+        terms = (float(initial_balance), float(option))
+    except (TypeError, ValueError):
+        return None
+    return terms if math.isfinite(terms[0]) and math.isfinite(terms[1]) else None
+
+# Largest amount, in paise, a posting may carry: what fits the int64
+# columns of the ledger and the reports.
+_MAX_PAISE = (1 << 63) - 1
+
+def _to_paise(amount):
+    # Balances are held as integer paise so repeated deposits and interest
+    # runs never drift; the public API keeps taking and returning rupees.
+    return round(amount * 100)
+
+def _amount_paise(amount):
+    # Paise of a deposit, withdrawal or transfer amount. NaN and infinite
+    # amounts give 0, which every operation refuses, so they return False
+    # as they did when balances were floats.
+    paise = amount * 100
+    return round(paise) if math.isfinite(paise) else 0
+
 class Account:
+    __slots__ = ("_account_number", "_balance", "_account_holder_id")
     def __init__(self, account_number, account_holder_id, balance=0.0):
         self._account_number = account_number
-        self._balance = balance
+        self._balance = _to_paise(balance)
         self._account_holder_id = account_holder_id
 
     @property
@@ -9,14 +120,22 @@ class Account:
         return self._account_number
     @property
     def balance(self):
-        return self._balance
+        return self._balance / 100
     @property
     def account_holder_id(self):
         return self._account_holder_id
     def display_details(self):
-        return f"Acc No: {self._account_number}, Bal: Rs{self._balance:.2f}"
+        return f"Acc No: {self._account_number}, Bal: Rs{self.balance:.2f}"
+    def to_dict(self):
+        return {
+            "account_number": self._account_number,
+            "account_holder_id": self._account_holder_id,
+            "balance": self.balance,
+            "type": "account"
+        }
 
 class SavingsAccount(Account):
+    __slots__ = ("_interest_rate",)
     def __init__(self, account_number, account_holder_id, balance=0.0, interest_rate=0.01):
         super().__init__(account_number, account_holder_id, balance)
         self._interest_rate = interest_rate
@@ -28,50 +147,77 @@ class SavingsAccount(Account):
         self._interest_rate = value if value >= 0 else self._interest_rate
     
     def deposit(self, amount):
-        if amount > 0:
-            self._balance += amount
+        paise = _amount_paise(amount)
+        if paise > 0:
+            self._balance += paise
             return True
         return False
     def withdraw(self, amount):
-        if amount > 0 and self._balance >= amount:
-            self._balance -= amount
+        paise = _amount_paise(amount)
+        if paise > 0 and self._balance >= paise:
+            self._balance -= paise
             return True
         return False
-    def apply_interest(self):
-        self._balance += self._balance * self._interest_rate
+    def apply_interest(self, compounding_periods=1):
+        self._balance += round(self._balance * _interest_growth(self._interest_rate, compounding_periods))
+    def _withdraw_floor(self):
+        return 0
     def display_details(self):
         return f"{super().display_details()}, Int Rate: {self._interest_rate:.2%}"
+    def to_dict(self):
+        data = super().to_dict()
+        data["interest_rate"] = self._interest_rate
+        data["type"] = "savings"
+        return data
 
 class CheckingAccount(Account):
+    __slots__ = ("_overdraft_limit",)
     def __init__(self, account_number, account_holder_id, balance=0.0, overdraft_limit=0.0):
         super().__init__(account_number, account_holder_id, balance)
-        self._overdraft_limit = overdraft_limit
+        self._overdraft_limit = _to_paise(overdraft_limit)
     @property
     def overdraft_limit(self):
-        return self._overdraft_limit
+        return self._overdraft_limit / 100
     
     @overdraft_limit.setter
     def overdraft_limit(self, value):
-        self._overdraft_limit = value if value >= 0 else self._overdraft_limit
+        self._overdraft_limit = _to_paise(value) if 0 <= value < math.inf else self._overdraft_limit
     def deposit(self, amount):
-        if amount > 0:
-            self._balance += amount
+        paise = _amount_paise(amount)
+        if paise > 0:
+            self._balance += paise
             return True
         return False
     def withdraw(self, amount):
-        if amount > 0 and self._balance - amount >= -self._overdraft_limit:
-            self._balance -= amount
+        paise = _amount_paise(amount)
+        if paise > 0 and self._balance - paise >= -self._overdraft_limit:
+            self._balance -= paise
             return True
         return False
+    def _withdraw_floor(self):
+        return -self._overdraft_limit
     def display_details(self) -> str:
-        return f"{super().display_details()}, OD Limit: Rs{self._overdraft_limit:.2f}"
+        return f"{super().display_details()}, OD Limit: Rs{self.overdraft_limit:.2f}"
+    def to_dict(self):
+        data = super().to_dict()
+        data["overdraft_limit"] = self.overdraft_limit
+        data["type"] = "checking"
+        return data
+
+def account_from_dict(data):
+    if data["type"] == "savings":
+        return SavingsAccount(data["account_number"], data["account_holder_id"], data["balance"], data["interest_rate"])
+    if data["type"] == "checking":
+        return CheckingAccount(data["account_number"], data["account_holder_id"], data["balance"], data["overdraft_limit"])
+    return Account(data["account_number"], data["account_holder_id"], data["balance"])
 
 class Customer:
+    __slots__ = ("_customer_id", "_name", "_address", "_account_numbers")
     def __init__(self, customer_id, name, address):
         self._customer_id = customer_id
         self._name = name
         self._address = address
-        self._account_numbers = []
+        self._account_numbers = {}
     @property
     def customer_id(self):
         return self._customer_id
@@ -83,190 +229,1642 @@ class Customer:
         return self._address
     @property
     def account_numbers(self):
-        return list(self._account_numbers)
+        # Read-only live view in creation order; dict keys double as an
+        # ordered set, so ownership checks are O(1).
+        return self._account_numbers.keys()
     def add_account_number(self, account_number):
-        if account_number not in self._account_numbers:
-            self._account_numbers.append(account_number)
+        self._account_numbers.setdefault(account_number, None)
     def display_details(self):
         return f"Cust ID: {self._customer_id}, Name: {self._name}, Accs: {len(self._account_numbers)}"
 
 class Bank:
     _next_account_number = 1000
-    def __init__(self):
+    _account_number_lock = threading.Lock()
+    LOCK_STRIPES = 64
+    def __init__(self, lock_stripes=LOCK_STRIPES):
         self._customers = {}
         self._accounts = {}
+        self._slots = {}
+        self._slot_accounts = []
+        # customer_id -> {account_number: account} and
+        # account_type -> {account_number: account}, in creation order.
+        self._customer_accounts = {}
+        self._accounts_by_type = {"savings": {}, "checking": {}}
+        # Balances are guarded by a fixed pool of stripes (slot % stripes);
+        # the registry lock guards customer and account creation/removal.
+        self._locks = [threading.Lock() for _ in range(lock_stripes)]
+        self._registry_lock = threading.Lock()
+        self._journal = None
+        self._ledger = None
+        self._velocity = None
 
-    def _is_valid_customer_id(self, customer_id):
-        if not customer_id:  # Check if the ID is empty
+    @classmethod
+    def recover(cls, directory, **journal_options):
+        # Loads the latest snapshot in directory, replays the log written
+        # after it and keeps journaling every change from then on.
+        bank = cls()
+        journal = BankJournal(directory, **journal_options)
+        journal.load(bank)
+        bank._journal = journal
+        return bank
+
+    def checkpoint(self):
+        if self._journal is None:
             return False
-        for char in customer_id:
-            if not (char.isalnum() or char == '_'):
-                return False
+        with self._registry_lock, _holding(self._locks):
+            self._journal.write_snapshot(self)
         return True
 
+    def close(self):
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+    def attach_ledger(self, ledger):
+        # Starts recording postings into a TransactionLedger. Accounts that
+        # already exist get an opening entry for their current balance.
+        with self._registry_lock, _holding(self._locks):
+            ledger.append([(slot, a._balance, ledger.OPEN) for slot, a in enumerate(self._slot_accounts)])
+            self._ledger = ledger
+
+    @property
+    def ledger(self):
+        return self._ledger
+
+    def attach_velocity_limits(self, limiter):
+        # Withdrawals and outgoing transfers (including apply_batch ones)
+        # that would succeed are first checked against limiter; a refused
+        # one returns its VelocityRejection instead of True. None detaches.
+        with self._registry_lock, _holding(self._locks):
+            self._velocity = limiter
+
+    @property
+    def velocity_limits(self):
+        return self._velocity
+
+    def _velocity_check(self, account, amount):
+        # Only debits the balance rules would allow are counted.
+        paise = _amount_paise(amount)
+        if paise > 0 and account._balance - paise >= account._withdraw_floor():
+            return self._velocity.admit(self._slots[account._account_number], account._account_holder_id,
+                                        paise, account._account_number)
+        return None
+
+    def balance_as_of(self, account_number, timestamp):
+        if self._ledger is None or account_number not in self._slots:
+            return None
+        return self._ledger.balance_as_of(self._slots[account_number], timestamp) / 100
+
+    def account_history(self, account_number, start=None, end=None):
+        # Yields (timestamp, kind, amount in rupees) for one account.
+        if self._ledger is None or account_number not in self._slots:
+            return
+        names = self._ledger.KIND_NAMES
+        for timestamp, amount, kind in self._ledger.account_postings(self._slots[account_number], start, end):
+            yield timestamp, names[kind], amount / 100
+
+    def _maybe_checkpoint(self):
+        journal = self._journal
+        if journal is not None and journal.checkpoint_due():
+            self.checkpoint()
+
+    @classmethod
+    def _allocate_account_number(cls):
+        with cls._account_number_lock:
+            account_number = cls._next_account_number
+            cls._next_account_number += 1
+        return str(account_number)
+
+    def _lock_for(self, account_number):
+        return self._locks[self._slots[account_number] % len(self._locks)]
+
+    def _stripe_locks(self, slots):
+        # Always acquired in ascending stripe order, so transfers running in
+        # opposite directions cannot deadlock.
+        n = len(self._locks)
+        return [self._locks[i] for i in sorted({slot % n for slot in slots})]
+
+    def _is_valid_customer_id(self, customer_id):
+        return _CUSTOMER_ID.fullmatch(customer_id) is not None
+
     def add_customer(self, customer):
         if not self._is_valid_customer_id(customer.customer_id):
             print("Error: Customer ID must be alphanumeric and can include underscores.")
             return False
             
-        if customer.customer_id not in self._customers:
+        with self._registry_lock:
+            if customer.customer_id in self._customers:
+                return False
+            if self._journal is not None:
+                self._journal.append("add_customer", customer.customer_id, customer.name, customer.address)
             self._customers[customer.customer_id] = customer
-            return True
-        return False
+        self._maybe_checkpoint()
+        return True
+
+    def bulk_add_customers(self, rows, chunk_size=10000, max_rejects=1000, pause_gc=False):
+        # rows yields Customer objects or (customer_id, name, address)
+        # tuples. Input is consumed chunk by chunk, one registry lock hold
+        # per chunk, and nothing is printed; rejects go to the report.
+        # pause_gc turns the cyclic GC off for the whole process until the
+        # import ends, which speeds up very large imports (Customer objects
+        # never form cycles) but also pauses it for every other thread.
+        report = ImportReport(max_rejects)
+        gc_paused = pause_gc and gc.isenabled()
+        if gc_paused:
+            gc.disable()
+        try:
+            chunk = []
+            for row_number, row in enumerate(rows, 1):
+                chunk.append((row_number, row))
+                if len(chunk) >= chunk_size:
+                    self._add_customer_chunk(chunk, report)
+                    chunk = []
+                    self._maybe_checkpoint()
+            if chunk:
+                self._add_customer_chunk(chunk, report)
+                self._maybe_checkpoint()
+        finally:
+            if gc_paused:
+                gc.enable()
+        return report
+
+    def _add_customer_chunk(self, chunk, report):
+        valid_id = _CUSTOMER_ID.fullmatch
+        customers = self._customers
+        journal = self._journal
+        with self._registry_lock:
+            for row_number, row in chunk:
+                if isinstance(row, Customer):
+                    customer, fields = row, (row.customer_id, row.name, row.address)
+                else:
+                    customer, fields = None, _customer_fields(row)
+                    if fields is None:
+                        report.reject(row_number, _first_field(row), "malformed")
+                        continue
+                customer_id = fields[0]
+                if not isinstance(customer_id, str) or valid_id(customer_id) is None:
+                    report.reject(row_number, customer_id, "invalid_id")
+                elif customer_id in customers:
+                    report.reject(row_number, customer_id, "duplicate")
+                else:
+                    if journal is not None:
+                        journal.append("add_customer", *fields)
+                    customers[customer_id] = customer or Customer(*fields)
+                    report.added += 1
+
+    def import_customers_csv(self, path, chunk_size=10000, max_rejects=1000, pause_gc=False):
+        # Streams a customer_id,name,address CSV (header row optional).
+        with open(path, newline="", encoding="utf-8") as f:
+            rows = csv.reader(f)
+            first = next(rows, None)
+            if first is None:
+                return ImportReport(max_rejects)
+            if first[:1] != ["customer_id"]:
+                rows = itertools.chain([first], rows)
+            return self.bulk_add_customers(rows, chunk_size, max_rejects, pause_gc)
         
     def remove_customer(self, customer_id):
-        if customer_id in self._customers and not self._customers[customer_id].account_numbers:
+        with self._registry_lock:
+            if customer_id not in self._customers or self._customer_accounts.get(customer_id):
+                return False
+            if self._journal is not None:
+                self._journal.append("remove_customer", customer_id)
             del self._customers[customer_id]
-            return True
-        return False
+            self._customer_accounts.pop(customer_id, None)
+        self._maybe_checkpoint()
+        return True
     def create_account(self, customer_id, account_type, initial_balance=0.0, **kwargs):
-        if customer_id not in self._customers:
+        terms = _account_terms(account_type, initial_balance, kwargs)
+        if terms is None:
             return None
-        customer = self._customers[customer_id]
-        account_number = str(Bank._next_account_number)
-        Bank._next_account_number += 1
-        account = None
+        initial_balance, option = terms
+        with self._registry_lock:
+            if customer_id not in self._customers:
+                return None
+            account_number = self._allocate_account_number()
+            # Logged before the account is published, so no posting to it
+            # can reach the log ahead of its creation.
+            if self._journal is not None:
+                self._journal.append("create_account", customer_id, account_type, account_number, initial_balance, option)
+            account = self._register_account(customer_id, account_type, account_number, initial_balance, option)
+            if self._ledger is not None:
+                self._ledger.append([(self._slots[account_number], account._balance, self._ledger.OPEN)])
+        self._maybe_checkpoint()
+        return account
+    def _register_account(self, customer_id, account_type, account_number, balance, option):
         if account_type == "savings":
-            account = SavingsAccount(account_number, customer_id, initial_balance, kwargs.get("interest_rate", 0.01))
-        elif account_type == "checking":
-            account = CheckingAccount(account_number, customer_id, initial_balance, kwargs.get("overdraft_limit", 0.0))
-        
-        if account:
-            self._accounts[account_number] = account
-            customer.add_account_number(account_number)
+            account = SavingsAccount(account_number, customer_id, balance, option)
+        else:
+            account = CheckingAccount(account_number, customer_id, balance, option)
+        self._slots[account_number] = len(self._slot_accounts)
+        self._slot_accounts.append(account)
+        self._accounts[account_number] = account
+        self._accounts_by_type[account_type][account_number] = account
+        self._customer_accounts.setdefault(customer_id, {})[account_number] = account
+        self._customers[customer_id].add_account_number(account_number)
         return account
     def deposit(self, account_number, amount):
         if account_number in self._accounts:
-            return self._accounts[account_number].deposit(amount)
+            with self._lock_for(account_number):
+                ok = self._accounts[account_number].deposit(amount)
+                if ok and self._journal is not None:
+                    self._journal.append("deposit", account_number, amount)
+                if ok and self._ledger is not None:
+                    self._ledger.append([(self._slots[account_number], _to_paise(amount), self._ledger.DEPOSIT)])
+            self._maybe_checkpoint()
+            return ok
         return False
     def withdraw(self, account_number, amount):
         if account_number in self._accounts:
-            return self._accounts[account_number].withdraw(amount)
+            with self._lock_for(account_number):
+                if self._velocity is not None:
+                    rejection = self._velocity_check(self._accounts[account_number], amount)
+                    if rejection is not None:
+                        return rejection
+                ok = self._accounts[account_number].withdraw(amount)
+                if ok and self._journal is not None:
+                    self._journal.append("withdraw", account_number, amount)
+                if ok and self._ledger is not None:
+                    self._ledger.append([(self._slots[account_number], -_to_paise(amount), self._ledger.WITHDRAW)])
+            self._maybe_checkpoint()
+            return ok
         return False
     def transfer_funds(self, from_acc_num, to_acc_num, amount):
         if from_acc_num in self._accounts and to_acc_num in self._accounts:
             from_account = self._accounts[from_acc_num]
             to_account = self._accounts[to_acc_num]
-            if from_account.withdraw(amount):
-                to_account.deposit(amount)
-                return True
+            slots = (self._slots[from_acc_num], self._slots[to_acc_num])
+            with _holding(self._stripe_locks(slots)):
+                if self._velocity is not None:
+                    rejection = self._velocity_check(from_account, amount)
+                    if rejection is not None:
+                        return rejection
+                ok = from_account.withdraw(amount)
+                if ok:
+                    to_account.deposit(amount)
+                    if self._journal is not None:
+                        self._journal.append("transfer", from_acc_num, to_acc_num, amount)
+                    if self._ledger is not None:
+                        paise, ledger = _to_paise(amount), self._ledger
+                        ledger.append([(slots[0], -paise, ledger.TRANSFER_OUT), (slots[1], paise, ledger.TRANSFER_IN)])
+            self._maybe_checkpoint()
+            return ok
         return False
+    def apply_batch(self, postings):
+        # Postings are ("deposit", acc, amount), ("withdraw", acc, amount) or
+        # ("transfer", from_acc, to_acc, amount). Balances of the touched
+        # slots are copied into a flat list, the whole batch runs against it
+        # in order under one acquisition of their locks, and each account is
+        # written back once at the end. A debit refused by velocity limits
+        # gets its VelocityRejection, and a malformed posting (wrong shape,
+        # non-numeric, non-finite or out-of-range amount) just gets False.
+        # This is an interpreter loop like the per-call path, not a
+        # vectorised one: every posting depends on the balances the earlier
+        # ones left, so what it saves is the per-call locking, lookups and
+        # checkpoint checks.
+        get_slot = self._slots.get
+        local = {}
+        touched = []
+        plan = []
+        for posting in postings:
+            try:
+                kind = posting[0]
+                size = len(posting)
+                if kind == "transfer" and size == 4:
+                    src, dst, amount = get_slot(posting[1]), get_slot(posting[2]), posting[3]
+                elif (kind == "deposit" or kind == "withdraw") and size == 3:
+                    src, dst, amount = get_slot(posting[1]), -1, posting[2]
+                else:
+                    plan.append(None)
+                    continue
+                paise = round(amount * 100)
+            except (IndexError, KeyError, TypeError, ValueError, OverflowError):
+                plan.append(None)
+                continue
+            if src is None or dst is None or not 0 < paise <= _MAX_PAISE:
+                plan.append(None)
+                continue
+            i = local.get(src)
+            if i is None:
+                i = local[src] = len(touched)
+                touched.append(src)
+            if dst >= 0:
+                j = local.get(dst)
+                if j is None:
+                    j = local[dst] = len(touched)
+                    touched.append(dst)
+            else:
+                j = -1
+            plan.append((kind, i, j, paise, posting))
+
+        # Nothing reaches the journal or the ledger until every balance has
+        # been written back, and if the batch raises part way the debits
+        # velocity limits already counted are taken back.
+        accounts = self._slot_accounts
+        ledger = self._ledger
+        velocity = self._velocity
+        journal = self._journal
+        records = []
+        entries = []
+        admitted = []
+        results = []
+        with _holding(self._stripe_locks(touched)):
+            try:
+                balances = [accounts[slot]._balance for slot in touched]
+                floors = [accounts[slot]._withdraw_floor() for slot in touched]
+                for entry in plan:
+                    if entry is None:
+                        results.append(False)
+                        continue
+                    kind, i, j, amount, posting = entry
+                    if kind == "deposit":
+                        balances[i] += amount
+                    elif balances[i] - amount >= floors[i]:
+                        if velocity is not None:
+                            account = accounts[touched[i]]
+                            rejection = velocity.admit(touched[i], account._account_holder_id, amount, account._account_number)
+                            if rejection is not None:
+                                results.append(rejection)
+                                continue
+                            admitted.append((touched[i], account._account_holder_id, amount))
+                        balances[i] -= amount
+                        if j >= 0:
+                            balances[j] += amount
+                    else:
+                        results.append(False)
+                        continue
+                    results.append(True)
+                    if journal is not None:
+                        records.append(posting)
+                    if ledger is not None:
+                        if kind == "deposit":
+                            entries.append((touched[i], amount, ledger.DEPOSIT))
+                        elif kind == "withdraw":
+                            entries.append((touched[i], -amount, ledger.WITHDRAW))
+                        else:
+                            entries.append((touched[i], -amount, ledger.TRANSFER_OUT))
+                            entries.append((touched[j], amount, ledger.TRANSFER_IN))
+            except BaseException:
+                for slot, customer_id, amount in admitted:
+                    velocity.refund(slot, customer_id, amount)
+                raise
+
+            for idx, slot in enumerate(touched):
+                accounts[slot]._balance = balances[idx]
+            for posting in records:
+                journal.append(*posting)
+            if entries:
+                ledger.append(entries)
+        self._maybe_checkpoint()
+        return results
     def get_customer_accounts(self, customer_id):
-        if customer_id in self._customers:
-            return [self._accounts[acc_num] for acc_num in self._customers[customer_id].account_numbers if acc_num in self._accounts]
-        return []
-    def display_all_customers(self):
-        for c in self._customers.values():
-            print(c.display_details())
-    def apply_all_interest(self):
-        for a in self._accounts.values():
-            if isinstance(a, SavingsAccount):
-                a.apply_interest()
-
-bank = Bank()
-
-while True:
-    print("\nBanking System Menu:")
-    print("1. Add Customer")
-    print("2. Create Account")
-    print("3. Deposit")
-    print("4. Withdraw")
-    print("5. Transfer Funds")
-    print("6. View Customer Accounts")
-    print("7. Apply Interest")
-    print("8. Display All Customers")
-    print("9. Exit")    
-
-    choice = input("Enter your choice: ")
-
-    if choice == '1':
-        cid = input("Enter customer ID: ")
-        name = input("Enter customer name: ")
-        addr = input("Enter customer address: ")
-        if bank.add_customer(Customer(cid, name, addr)):
-            print("Customer added.")
+        # A live view over the index, not a copy. Code that may run while
+        # other threads open accounts iterates list_customer_accounts().
+        accounts = self._customer_accounts.get(customer_id)
+        return accounts.values() if accounts is not None else ()
+    def list_customer_accounts(self, customer_id):
+        # A copy taken under the registry lock, safe to iterate on one
+        # thread while others open accounts.
+        with self._registry_lock:
+            return list(self.get_customer_accounts(customer_id))
+    def get_accounts_by_type(self, account_type):
+        accounts = self._accounts_by_type.get(account_type)
+        return accounts.values() if accounts is not None else ()
+    def owns_account(self, customer_id, account_number):
+        return account_number in self._customer_accounts.get(customer_id, ())
+    def display_all_customers(self, out=None):
+        out = out or sys.stdout
+        with self._registry_lock:
+            customers = list(self._customers.values())
+        for chunk in _chunked(customers, 10000):
+            out.write("".join(c.display_details() + "\n" for c in chunk))
+
+    # Reports are generators of record chunks read without taking account
+    # locks, so a balance may be caught between the two legs of an
+    # in-flight transfer. Money columns are integer paise.
+    ACCOUNT_REPORT_FIELDS = ("account_number", "customer_id", "customer_name", "account_type", "balance", "interest_rate", "overdraft_limit")
+    ACCOUNT_REPORT_KINDS = "ssssmdm"
+    CUSTOMER_REPORT_FIELDS = ("customer_id", "name", "address", "accounts")
+    CUSTOMER_REPORT_KINDS = "sssi"
+
+    def iter_account_records(self, account_type=None, min_balance=None, max_balance=None, overdrawn=False, chunk_size=10000):
+        if account_type is not None and account_type not in self._accounts_by_type:
+            raise ValueError(f"unknown account type {account_type!r}")
+        low = _to_paise(min_balance) if min_balance is not None else None
+        high = _to_paise(max_balance) if max_balance is not None else None
+        customers = self._customers
+        # Slots only ever grow, so walking a fixed prefix is safe while
+        # other threads open accounts.
+        accounts = itertools.islice(self._slot_accounts, len(self._slot_accounts))
+        chunk = []
+        for a in accounts:
+            is_savings = type(a) is SavingsAccount
+            if account_type is not None and is_savings != (account_type == "savings"):
+                continue
+            balance = a._balance
+            if overdrawn and (is_savings or balance >= 0):
+                continue
+            if (low is not None and balance < low) or (high is not None and balance > high):
+                continue
+            holder = customers.get(a._account_holder_id)
+            if is_savings:
+                record = (a._account_number, a._account_holder_id, holder.name if holder else "", "savings", balance, a._interest_rate, None)
+            else:
+                record = (a._account_number, a._account_holder_id, holder.name if holder else "", "checking", balance, None, a._overdraft_limit)
+            chunk.append(record)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def iter_customer_records(self, chunk_size=10000):
+        index = self._customer_accounts
+        # A list of references is copied because the customer dict may be
+        # resized by other threads while the report streams.
+        for chunk in _chunked(list(self._customers.values()), chunk_size):
+            yield [(c.customer_id, c.name, c.address, len(index.get(c.customer_id, ()))) for c in chunk]
+
+    def export_accounts(self, path, fmt="csv", **filters):
+        chunks = self.iter_account_records(**filters)
+        return write_report(path, fmt, self.ACCOUNT_REPORT_FIELDS, self.ACCOUNT_REPORT_KINDS, chunks)
+
+    def export_customers(self, path, fmt="csv", chunk_size=10000):
+        chunks = self.iter_customer_records(chunk_size)
+        return write_report(path, fmt, self.CUSTOMER_REPORT_FIELDS, self.CUSTOMER_REPORT_KINDS, chunks)
+    def apply_all_interest(self, compounding_periods=1):
+        # One pass over the savings index; the growth factor is computed once
+        # per distinct rate. Balances live on the account objects, so copying
+        # them into parallel arrays and back costs two extra passes: the
+        # array_columns variant of bank.interest in benchmarks.py is about
+        # 2x slower than this loop.
+        with self._registry_lock, _holding(self._locks):
+            growth = {}
+            ledger = self._ledger
+            postings = [] if ledger is not None else None
+            slots = self._slots
+            for account in self._accounts_by_type["savings"].values():
+                rate = account._interest_rate
+                factor = growth.get(rate)
+                if factor is None:
+                    factor = growth[rate] = _interest_growth(rate, compounding_periods)
+                interest = round(account._balance * factor)
+                if interest:
+                    account._balance += interest
+                    if postings is not None:
+                        postings.append((slots[account._account_number], interest, ledger.INTEREST))
+            if postings:
+                ledger.append(postings)
+            if self._journal is not None:
+                self._journal.append("interest", compounding_periods)
+        self._maybe_checkpoint()
+
+# Write-ahead log records are <op code, payload length, crc32> followed by
+# the payload fields: "s" is a length-prefixed UTF-8 string, "d" a float64
+# and "q" an int64. A snapshot is the same field encoding laid out flat.
+_WAL_OPS = {
+    "add_customer": (1, "sss"),
+    "remove_customer": (2, "s"),
+    "create_account": (3, "sssdd"),
+    "deposit": (4, "sd"),
+    "withdraw": (5, "sd"),
+    "transfer": (6, "ssd"),
+    "interest": (7, "q"),
+}
+_WAL_OPS_BY_CODE = {code: (op, fields) for op, (code, fields) in _WAL_OPS.items()}
+_WAL_HEADER = struct.Struct("<BII")
+_SNAPSHOT_MAGIC = b"BANKSNP2"
+_U32 = struct.Struct("<I")
+_F64 = struct.Struct("<d")
+_I64 = struct.Struct("<q")
+
+def _pack_fields(fields, values, out):
+    for kind, value in zip(fields, values):
+        if kind == "s":
+            data = value.encode()
+            out += _U32.pack(len(data))
+            out += data
+        elif kind == "d":
+            out += _F64.pack(value)
+        else:
+            out += _I64.pack(value)
+
+def _unpack_fields(fields, buf, offset):
+    values = []
+    for kind in fields:
+        if kind == "s":
+            (length,) = _U32.unpack_from(buf, offset)
+            offset += 4
+            values.append(str(buf[offset:offset + length], "utf-8"))
+            offset += length
+        elif kind == "d":
+            values.append(_F64.unpack_from(buf, offset)[0])
+            offset += 8
+        else:
+            values.append(_I64.unpack_from(buf, offset)[0])
+            offset += 8
+    return values, offset
+
+class BankJournal:
+    SNAPSHOT_FILE = "bank.snapshot"
+    def __init__(self, directory, group_size=1024, max_delay=0.05, snapshot_every=1_000_000):
+        # Records are buffered and written with a single fsync once
+        # group_size of them are pending; a flusher thread commits whatever
+        # is left every max_delay seconds, so an operation that returned is
+        # on disk within about max_delay. sync() forces a commit.
+        self._directory = directory
+        self._group_size = group_size
+        self._max_delay = max_delay
+        self._snapshot_every = snapshot_every
+        self._lock = threading.Lock()
+        self._buffer = bytearray()
+        self._pending = 0
+        self._since_snapshot = 0
+        self._generation = 0
+        self._file = None
+        self._stop = threading.Event()
+        self._flusher = None
+
+    def _wal_path(self, generation):
+        return os.path.join(self._directory, f"wal.{generation:08d}")
+
+    def _snapshot_path(self):
+        return os.path.join(self._directory, self.SNAPSHOT_FILE)
+
+    def load(self, bank):
+        os.makedirs(self._directory, exist_ok=True)
+        highest = -1
+        path = self._snapshot_path()
+        if os.path.exists(path):
+            highest = self._load_snapshot(bank, path)
+        wal_path = self._wal_path(self._generation)
+        valid_length = 0
+        if os.path.exists(wal_path):
+            with open(wal_path, "rb") as f:
+                data = f.read()
+            valid_length, replayed_highest = self._replay(bank, data)
+            highest = max(highest, replayed_highest)
+        with Bank._account_number_lock:
+            Bank._next_account_number = max(Bank._next_account_number, highest + 1)
+        for name in os.listdir(self._directory):
+            if name.startswith("wal.") and name < os.path.basename(wal_path):
+                os.remove(os.path.join(self._directory, name))
+        # A torn or unreadable record at the tail (crash mid-write) and
+        # anything after it is dropped.
+        self._file = open(wal_path, "ab")
+        self._file.truncate(valid_length)
+        self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+        self._flusher.start()
+
+    def _flush_loop(self):
+        while not self._stop.wait(self._max_delay):
+            with self._lock:
+                if self._buffer:
+                    self._commit()
+
+    def _load_snapshot(self, bank, path):
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            if buf[:len(_SNAPSHOT_MAGIC)] != _SNAPSHOT_MAGIC:
+                raise ValueError(f"{path} is not a bank snapshot")
+            (self._generation, highest, customer_count), offset = _unpack_fields("qqq", buf, len(_SNAPSHOT_MAGIC))
+            for _ in range(customer_count):
+                (customer_id, name, address), offset = _unpack_fields("sss", buf, offset)
+                bank._customers[customer_id] = Customer(customer_id, name, address)
+            (account_count,), offset = _unpack_fields("q", buf, offset)
+            for _ in range(account_count):
+                (customer_id, account_type, account_number, balance, option), offset = _unpack_fields("sssqd", buf, offset)
+                account = bank._register_account(customer_id, account_type, account_number, 0, option)
+                account._balance = balance
+        return highest
+
+    def _replay(self, bank, data):
+        offset = 0
+        highest = -1
+        while offset + _WAL_HEADER.size <= len(data):
+            code, length, crc = _WAL_HEADER.unpack_from(data, offset)
+            start = offset + _WAL_HEADER.size
+            payload = data[start:start + length]
+            if len(payload) < length or zlib.crc32(payload) != crc or code not in _WAL_OPS_BY_CODE:
+                break
+            op, fields = _WAL_OPS_BY_CODE[code]
+            try:
+                values, end = _unpack_fields(fields, payload, 0)
+            except (struct.error, UnicodeDecodeError):
+                break
+            if end != length:
+                break
+            if op == "add_customer":
+                bank._customers[values[0]] = Customer(*values)
+            elif op == "remove_customer":
+                del bank._customers[values[0]]
+            elif op == "create_account":
+                bank._register_account(*values)
+                highest = max(highest, int(values[2]))
+            elif op == "deposit":
+                bank.deposit(*values)
+            elif op == "withdraw":
+                bank.withdraw(*values)
+            elif op == "transfer":
+                bank.transfer_funds(*values)
+            else:
+                bank.apply_all_interest(*values)
+            offset = start + length
+        return offset, highest
+
+    def append(self, op, *values):
+        # The record is packed on its own first, so values that cannot be
+        # encoded raise here without leaving anything in the log.
+        code, fields = _WAL_OPS[op]
+        payload = bytearray()
+        _pack_fields(fields, values, payload)
+        header = _WAL_HEADER.pack(code, len(payload), zlib.crc32(payload))
+        with self._lock:
+            self._buffer += header
+            self._buffer += payload
+            self._pending += 1
+            self._since_snapshot += 1
+            if self._pending >= self._group_size:
+                self._commit()
+
+    def _commit(self):
+        if self._buffer:
+            self._file.write(self._buffer)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._buffer.clear()
+        self._pending = 0
+
+    def sync(self):
+        with self._lock:
+            self._commit()
+
+    def checkpoint_due(self):
+        return self._since_snapshot >= self._snapshot_every
+
+    def write_snapshot(self, bank):
+        # Called by Bank.checkpoint with every bank lock held. The snapshot
+        # names the next log generation, so a crash before the old log is
+        # removed still replays exactly the records written after it.
+        with self._lock:
+            self._commit()
+            generation = self._generation + 1
+            highest = max((int(n) for n in bank._accounts), default=-1)
+            out = bytearray(_SNAPSHOT_MAGIC)
+            _pack_fields("qqq", (generation, highest, len(bank._customers)), out)
+            for c in bank._customers.values():
+                _pack_fields("sss", (c.customer_id, c.name, c.address), out)
+            _pack_fields("q", (len(bank._slot_accounts),), out)
+            for a in bank._slot_accounts:
+                if isinstance(a, SavingsAccount):
+                    record = (a.account_holder_id, "savings", a.account_number, a._balance, a.interest_rate)
+                else:
+                    record = (a.account_holder_id, "checking", a.account_number, a._balance, a.overdraft_limit)
+                _pack_fields("sssqd", record, out)
+            path = self._snapshot_path()
+            with open(path + ".tmp", "wb") as f:
+                f.write(out)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(path + ".tmp", path)
+            old_file, old_path = self._file, self._wal_path(self._generation)
+            self._generation = generation
+            self._file = open(self._wal_path(generation), "ab")
+            old_file.close()
+            os.remove(old_path)
+            self._since_snapshot = 0
+
+    def close(self):
+        self._stop.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        with self._lock:
+            self._commit()
+            self._file.close()
+
+
+class TransactionLedger:
+    # Append-only posting history. Records live in fixed-size segments of
+    # parallel arrays (timestamp, account slot, signed paise amount, kind);
+    # full segments can be spilled to memory-mapped files in spill_dir.
+    # Each slot keeps the ids of its records and its running balance after
+    # each, so history and point-in-time balances are bisections, not scans.
+    OPEN, DEPOSIT, WITHDRAW, TRANSFER_IN, TRANSFER_OUT, INTEREST = range(6)
+    KIND_NAMES = ("open", "deposit", "withdraw", "transfer_in", "transfer_out", "interest")
+    def __init__(self, segment_size=1 << 20, spill_dir=None, clock=time.time):
+        self._segment_size = segment_size
+        self._spill_dir = spill_dir
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._segments = []
+        self._mmaps = []
+        self._count = 0
+        self._last_timestamp = float("-inf")
+        self._by_slot = {}
+        self._new_segment()
+
+    def _new_segment(self):
+        self._segments.append((array('d'), array('q'), array('q'), array('b')))
+
+    def __len__(self):
+        return self._count
+
+    def append(self, entries):
+        # entries: (slot, signed paise amount, kind); they share a timestamp.
+        # Timestamps never go backwards, keeping the time index sorted.
+        with self._lock:
+            timestamp = max(self._clock(), self._last_timestamp)
+            self._last_timestamp = timestamp
+            by_slot = self._by_slot
+            for slot, amount, kind in entries:
+                timestamps, slots, amounts, kinds = self._segments[-1]
+                timestamps.append(timestamp)
+                slots.append(slot)
+                amounts.append(amount)
+                kinds.append(kind)
+                index = by_slot.get(slot)
+                if index is None:
+                    index = by_slot[slot] = (array('q'), array('q'))
+                ids, running = index
+                ids.append(self._count)
+                running.append((running[-1] if running else 0) + amount)
+                self._count += 1
+                if len(timestamps) == self._segment_size:
+                    if self._spill_dir is not None:
+                        self._spill(len(self._segments) - 1)
+                    self._new_segment()
+
+    def _spill(self, number):
+        os.makedirs(self._spill_dir, exist_ok=True)
+        path = os.path.join(self._spill_dir, f"ledger-{id(self):x}-{number:06d}.seg")
+        columns = self._segments[number]
+        with open(path, "wb") as f:
+            for column in columns:
+                f.write(column.tobytes())
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(mm)
+        n = self._segment_size
+        self._mmaps.append((path, mm, view))
+        self._segments[number] = (view[:8 * n].cast('d'), view[8 * n:16 * n].cast('q'),
+                                  view[16 * n:24 * n].cast('q'), view[24 * n:25 * n].cast('b'))
+
+    def close(self):
+        # Unmaps and deletes spilled segment files; the ledger is unusable
+        # afterwards.
+        with self._lock:
+            for segment in self._segments:
+                for column in segment:
+                    if isinstance(column, memoryview):
+                        column.release()
+            self._segments = []
+            for path, mm, view in self._mmaps:
+                view.release()
+                mm.close()
+                os.remove(path)
+            self._mmaps = []
+
+    def _column(self, column, record_id):
+        segment, offset = divmod(record_id, self._segment_size)
+        return self._segments[segment][column][offset]
+
+    def _timestamp_at(self, record_id):
+        return self._column(0, record_id)
+
+    def record(self, record_id):
+        segment, offset = divmod(record_id, self._segment_size)
+        timestamps, slots, amounts, kinds = self._segments[segment]
+        return timestamps[offset], slots[offset], amounts[offset], kinds[offset]
+
+    def balance_as_of(self, slot, timestamp):
+        index = self._by_slot.get(slot)
+        if index is None:
+            return 0
+        ids, running = index
+        position = bisect.bisect_right(ids, timestamp, key=self._timestamp_at)
+        return running[position - 1] if position else 0
+
+    def account_postings(self, slot, start=None, end=None):
+        # Yields (timestamp, amount, kind) for start <= timestamp < end.
+        index = self._by_slot.get(slot)
+        if index is None:
+            return
+        ids = index[0]
+        lo = bisect.bisect_left(ids, start, key=self._timestamp_at) if start is not None else 0
+        hi = bisect.bisect_left(ids, end, key=self._timestamp_at) if end is not None else len(ids)
+        for record_id in ids[lo:hi]:
+            timestamp, _, amount, kind = self.record(record_id)
+            yield timestamp, amount, kind
+
+    def postings_between(self, start, end):
+        # Yields (timestamp, slot, amount, kind) for start <= timestamp < end.
+        ids = range(self._count)
+        lo = bisect.bisect_left(ids, start, key=self._timestamp_at)
+        hi = bisect.bisect_left(ids, end, key=self._timestamp_at)
+        for record_id in range(lo, hi):
+            yield self.record(record_id)
+
+VelocityRule = namedtuple("VelocityRule", "name scope window max_amount max_count")
+
+class VelocityRejection(namedtuple("VelocityRejection", "rule scope key kind window limit observed")):
+    # Returned instead of False when a velocity rule refuses a debit. It is
+    # falsy, so `if bank.withdraw(...)` keeps working, and says which rule
+    # refused: kind is "amount" (limit and observed in rupees) or "count".
+    __slots__ = ()
+    def __bool__(self):
+        return False
+
+class VelocityLimiter:
+    # Sliding-window limits on debits (withdrawals and outgoing transfers)
+    # per account or per customer, e.g. VelocityRule("daily", "customer",
+    # 86400, 50000.0, None). Each rule keeps, per key, the totals of the
+    # current and the previous fixed window in flat arrays (32 bytes per key
+    # per rule); the sliding total is the current window plus the part of
+    # the previous one the sliding window still overlaps, assuming its
+    # debits were spread evenly. A check is a few array reads per rule.
+    SCOPES = ("account", "customer")
+    def __init__(self, rules, clock=time.monotonic, lock_stripes=64):
+        self._rules = []
+        for rule in rules:
+            if rule.scope not in self.SCOPES or rule.window <= 0:
+                raise ValueError(f"bad velocity rule {rule!r}")
+            limit = _to_paise(rule.max_amount) if rule.max_amount is not None else None
+            # previous amount, current amount, previous count, current count,
+            # current window number
+            columns = (array('q'), array('q'), array('i'), array('i'), array('q'))
+            self._rules.append((rule, rule.scope == "account", rule.window, limit, rule.max_count, columns))
+        self._clock = clock
+        self._customers = {}
+        self._locks = [threading.Lock() for _ in range(lock_stripes)]
+        self._grow_lock = threading.Lock()
+
+    def _customer_row(self, customer_id):
+        row = self._customers.get(customer_id)
+        if row is None:
+            with self._grow_lock:
+                row = self._customers.setdefault(customer_id, len(self._customers))
+        return row
+
+    def _ensure(self, columns, row):
+        # All columns grow together before the new rows are used.
+        with self._grow_lock:
+            size = len(columns[0])
+            if row < size:
+                return
+            extra = max(row + 1 - size, size, 1024)
+            for column in columns:
+                column.frombytes(bytes(extra * column.itemsize))
+
+    def admit(self, slot, customer_id, paise, account_number):
+        # Records a debit of paise against every rule, or records nothing
+        # and returns the VelocityRejection of the first rule it would break.
+        now = self._clock()
+        customer_row = self._customer_row(customer_id)
+        with self._locks[customer_row % len(self._locks)]:
+            for rule, per_account, length, limit, max_count, columns in self._rules:
+                row = slot if per_account else customer_row
+                if row >= len(columns[0]):
+                    self._ensure(columns, row)
+                prev_amount, amount, prev_count, count, epoch = columns
+                window = int(now // length)
+                if epoch[row] != window:
+                    if epoch[row] == window - 1:
+                        prev_amount[row], prev_count[row] = amount[row], count[row]
+                    else:
+                        prev_amount[row] = prev_count[row] = 0
+                    amount[row] = count[row] = 0
+                    epoch[row] = window
+                overlap = 1 - (now - window * length) / length
+                if limit is not None:
+                    observed = amount[row] + paise + prev_amount[row] * overlap
+                    if observed > limit:
+                        return self._reject(rule, account_number, customer_id, "amount", rule.max_amount, observed / 100)
+                if max_count is not None:
+                    observed = count[row] + 1 + prev_count[row] * overlap
+                    if observed > max_count:
+                        return self._reject(rule, account_number, customer_id, "count", max_count, observed)
+            for rule, per_account, length, limit, max_count, columns in self._rules:
+                row = slot if per_account else customer_row
+                columns[1][row] += paise
+                columns[3][row] += 1
+        return None
+
+    def refund(self, slot, customer_id, paise):
+        # Takes back a debit admit() recorded that was then not made. One
+        # admitted in a window that has since rolled over is left counted.
+        now = self._clock()
+        customer_row = self._customer_row(customer_id)
+        with self._locks[customer_row % len(self._locks)]:
+            for rule, per_account, length, limit, max_count, columns in self._rules:
+                row = slot if per_account else customer_row
+                if columns[4][row] == int(now // length):
+                    columns[1][row] = max(columns[1][row] - paise, 0)
+                    columns[3][row] = max(columns[3][row] - 1, 0)
+
+    @staticmethod
+    def _reject(rule, account_number, customer_id, kind, limit, observed):
+        key = account_number if rule.scope == "account" else customer_id
+        return VelocityRejection(rule.name, rule.scope, key, kind, rule.window, limit, round(observed, 2))
+
+def _chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+# Report field kinds: "s" string, "i" integer, "d" float and "m" money in
+# integer paise (rupees with two decimals in text formats).
+_REPORT_MAGIC = b"BANKCOL1"
+_REPORT_ARRAY_TYPES = {"i": "q", "m": "q", "d": "d"}
+
+def _report_text(kind, value):
+    if value is None:
+        return ""
+    if kind == "m":
+        return f"{value / 100:.2f}"
+    return value
+
+def write_report(path, fmt, fields, kinds, chunks):
+    # Writes record chunks as "csv", "jsonl" or "columnar" through a large
+    # write buffer, one write per chunk; returns the number of rows.
+    if fmt not in ("csv", "jsonl", "columnar"):
+        raise ValueError(f"unknown report format {fmt!r}")
+    rows = 0
+    if fmt == "columnar":
+        with open(path, "wb", buffering=1 << 20) as f:
+            header = bytearray(_REPORT_MAGIC)
+            _pack_fields("q", (len(fields),), header)
+            for name, kind in zip(fields, kinds):
+                _pack_fields("ss", (name, kind), header)
+            f.write(header)
+            for chunk in chunks:
+                f.write(_encode_columns(kinds, chunk))
+                rows += len(chunk)
+        return rows
+    with open(path, "w", newline="", encoding="utf-8", buffering=1 << 20) as f:
+        if fmt == "csv":
+            writer = csv.writer(f)
+            writer.writerow(fields)
+            for chunk in chunks:
+                writer.writerows([[_report_text(k, v) for k, v in zip(kinds, row)] for row in chunk])
+                rows += len(chunk)
+        else:
+            money = [i for i, k in enumerate(kinds) if k == "m"]
+            for chunk in chunks:
+                lines = []
+                for row in chunk:
+                    record = dict(zip(fields, row))
+                    for i in money:
+                        if row[i] is not None:
+                            record[fields[i]] = row[i] / 100
+                    lines.append(json.dumps(record))
+                lines.append("")
+                f.write("\n".join(lines))
+                rows += len(chunk)
+    return rows
+
+def _encode_columns(kinds, chunk):
+    # One block per chunk: row count, then each column in turn. Strings are
+    # an offsets array plus a UTF-8 blob; numbers are raw little-endian
+    # arrays (None becomes 0 or NaN).
+    out = bytearray(_U32.pack(len(chunk)))
+    for i, kind in enumerate(kinds):
+        column = [row[i] for row in chunk]
+        if kind == "s":
+            blobs = [v.encode() for v in column]
+            offsets = array('I', [0])
+            for b in blobs:
+                offsets.append(offsets[-1] + len(b))
+            values, data = offsets, b"".join(blobs)
+        elif kind == "d":
+            values, data = array('d', [float("nan") if v is None else v for v in column]), b""
         else:
-            print("Failed to add customer (ID might be invalid or already exists).")
+            values, data = array('q', [0 if v is None else v for v in column]), b""
+        if sys.byteorder == "big":
+            values.byteswap()
+        out += values.tobytes()
+        out += data
+    return bytes(out)
+
+def iter_columnar_report(path):
+    # Reads a columnar report back one chunk at a time as {field: column},
+    # where numeric columns are arrays and string columns lists.
+    with open(path, "rb") as f:
+        if f.read(len(_REPORT_MAGIC)) != _REPORT_MAGIC:
+            raise ValueError(f"{path} is not a columnar report")
+        header = f.read(8)
+        (count,), _ = _unpack_fields("q", header, 0)
+        fields = []
+        for _ in range(count):
+            pair = []
+            for _ in range(2):
+                (length,) = _U32.unpack(f.read(4))
+                pair.append(f.read(length).decode())
+            fields.append(tuple(pair))
+        while True:
+            head = f.read(4)
+            if not head:
+                return
+            (rows,) = _U32.unpack(head)
+            block = {}
+            for name, kind in fields:
+                if kind == "s":
+                    offsets = array('I')
+                    offsets.frombytes(f.read(4 * (rows + 1)))
+                    if sys.byteorder == "big":
+                        offsets.byteswap()
+                    blob = f.read(offsets[-1])
+                    block[name] = [blob[offsets[j]:offsets[j + 1]].decode() for j in range(rows)]
+                else:
+                    values = array(_REPORT_ARRAY_TYPES[kind])
+                    values.frombytes(f.read(8 * rows))
+                    if sys.byteorder == "big":
+                        values.byteswap()
+                    block[name] = values
+            yield block
+
+class _Shard:
+    # Runs inside a shard process and owns a plain Bank. Customers are
+    # replicated to every shard; each account lives on exactly one.
+    # Cross-shard transfers park their leg in _prepared between the two
+    # phases: a prepared debit has already left the source account and is
+    # refunded on abort, a prepared credit is applied on commit.
+    def __init__(self):
+        self._bank = Bank()
+        self._prepared = {}
+
+    def add_customer(self, customer_id, name, address):
+        return self._bank.add_customer(Customer(customer_id, name, address))
+    def has_accounts(self, customer_id):
+        return bool(self._bank._customer_accounts.get(customer_id))
+    def remove_customer(self, customer_id):
+        return self._bank.remove_customer(customer_id)
+    def create_account(self, customer_id, account_type, account_number, balance, option):
+        bank = self._bank
+        with bank._registry_lock:
+            if customer_id not in bank._customers:
+                return None
+            return bank._register_account(customer_id, account_type, account_number, balance, option).to_dict()
+    def deposit(self, account_number, amount):
+        return self._bank.deposit(account_number, amount)
+    def withdraw(self, account_number, amount):
+        return self._bank.withdraw(account_number, amount)
+    def transfer_funds(self, from_acc_num, to_acc_num, amount):
+        return self._bank.transfer_funds(from_acc_num, to_acc_num, amount)
+    def apply_batch(self, postings):
+        return self._bank.apply_batch(postings)
+    def apply_all_interest(self, compounding_periods):
+        return self._bank.apply_all_interest(compounding_periods)
+    def get_customer_accounts(self, customer_id):
+        return [a.to_dict() for a in self._bank.get_customer_accounts(customer_id)]
+    def customer_records(self):
+        return [record for chunk in self._bank.iter_customer_records() for record in chunk]
+    def export_accounts(self, path, fmt, filters):
+        return self._bank.export_accounts(path, fmt, **filters)
+
+    def prepare_debit(self, txid, account_number, amount):
+        if not self._bank.withdraw(account_number, amount):
+            return False
+        self._prepared[txid] = ("debit", account_number, amount)
+        return True
+    def prepare_credit(self, txid, account_number, amount):
+        if account_number not in self._bank._accounts or _amount_paise(amount) <= 0:
+            return False
+        self._prepared[txid] = ("credit", account_number, amount)
+        return True
+    def commit(self, txid):
+        leg, account_number, amount = self._prepared.pop(txid)
+        if leg == "credit":
+            self._bank.deposit(account_number, amount)
+        return True
+    def abort(self, txid):
+        leg, account_number, amount = self._prepared.pop(txid, (None, None, None))
+        if leg == "debit":
+            self._bank.deposit(account_number, amount)
+        return True
+
+def _shard_worker(conn):
+    shard = _Shard()
+    while True:
+        request = conn.recv()
+        if request is None:
+            break
+        method, args = request
+        try:
+            conn.send((True, getattr(shard, method)(*args)))
+        except Exception as e:
+            conn.send((False, e))
+    conn.close()
+
+class ShardedBank:
+    # Same operations as Bank, spread over worker processes so they are not
+    # bound to one interpreter. Accounts are placed by account number
+    # modulo the shard count; single-account calls go to the owning shard,
+    # fan-out calls are sent to every shard before any reply is read, and a
+    # transfer between shards commits through prepare/commit on both.
+    # Accounts returned to callers are detached copies.
+    def __init__(self, shards=4):
+        context = multiprocessing.get_context()
+        self._conns = []
+        self._processes = []
+        for _ in range(shards):
+            parent, child = context.Pipe()
+            process = context.Process(target=_shard_worker, args=(child,), daemon=True)
+            process.start()
+            child.close()
+            self._conns.append(parent)
+            self._processes.append(process)
+        self._locks = [threading.Lock() for _ in range(shards)]
+        self._registry_lock = threading.Lock()
+        self._txids = itertools.count()
+
+    def __enter__(self):
+        return self
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        for lock, conn in zip(self._locks, self._conns):
+            with lock:
+                conn.send(None)
+                conn.close()
+        for process in self._processes:
+            process.join()
+
+    def _shard_of(self, account_number):
+        try:
+            return int(account_number) % len(self._conns)
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def _result(reply):
+        ok, result = reply
+        if not ok:
+            raise result
+        return result
+
+    def _call(self, shard, method, *args):
+        with self._locks[shard]:
+            self._conns[shard].send((method, args))
+            return self._result(self._conns[shard].recv())
+
+    def _fan_out(self, calls):
+        # calls: {shard: (method, args)}; locks are taken in shard order.
+        # Every shard that was sent a call has its reply read before any
+        # failure is raised, so no pipe is left holding a stale reply.
+        shards = sorted(calls)
+        sent = []
+        with _holding([self._locks[i] for i in shards]):
+            try:
+                for i in shards:
+                    self._conns[i].send(calls[i])
+                    sent.append(i)
+            finally:
+                replies = {i: self._conns[i].recv() for i in sent}
+        return {i: self._result(replies[i]) for i in shards}
+
+    def _broadcast(self, method, *args):
+        replies = self._fan_out({i: (method, args) for i in range(len(self._conns))})
+        return [replies[i] for i in range(len(self._conns))]
+
+    def add_customer(self, customer):
+        if _CUSTOMER_ID.fullmatch(customer.customer_id) is None:
+            print("Error: Customer ID must be alphanumeric and can include underscores.")
+            return False
+        with self._registry_lock:
+            return all(self._broadcast("add_customer", customer.customer_id, customer.name, customer.address))
+
+    def remove_customer(self, customer_id):
+        with self._registry_lock:
+            if any(self._broadcast("has_accounts", customer_id)):
+                return False
+            return all(self._broadcast("remove_customer", customer_id))
+
+    def create_account(self, customer_id, account_type, initial_balance=0.0, **kwargs):
+        terms = _account_terms(account_type, initial_balance, kwargs)
+        if terms is None:
+            return None
+        initial_balance, option = terms
+        with self._registry_lock:
+            account_number = Bank._allocate_account_number()
+            data = self._call(self._shard_of(account_number), "create_account",
+                              customer_id, account_type, account_number, initial_balance, option)
+        return account_from_dict(data) if data else None
+
+    def deposit(self, account_number, amount):
+        shard = self._shard_of(account_number)
+        return shard is not None and self._call(shard, "deposit", account_number, amount)
+
+    def withdraw(self, account_number, amount):
+        shard = self._shard_of(account_number)
+        return shard is not None and self._call(shard, "withdraw", account_number, amount)
+
+    def transfer_funds(self, from_acc_num, to_acc_num, amount):
+        src, dst = self._shard_of(from_acc_num), self._shard_of(to_acc_num)
+        if src is None or dst is None:
+            return False
+        if src == dst:
+            return self._call(src, "transfer_funds", from_acc_num, to_acc_num, amount)
+        txid = next(self._txids)
+        try:
+            votes = self._fan_out({src: ("prepare_debit", (txid, from_acc_num, amount)),
+                                   dst: ("prepare_credit", (txid, to_acc_num, amount))})
+        except Exception:
+            # A leg that did prepare is rolled back before the error is
+            # passed on, as a same-shard transfer would raise it.
+            self._fan_out({src: ("abort", (txid,)), dst: ("abort", (txid,))})
+            raise
+        decision = "commit" if votes[src] and votes[dst] else "abort"
+        self._fan_out({src: (decision, (txid,)), dst: (decision, (txid,))})
+        return decision == "commit"
+
+    def apply_batch(self, postings):
+        # Runs of postings that stay within one shard go out to all shards
+        # in parallel; a cross-shard transfer closes the run and commits on
+        # its own, so every account still sees its postings in order.
+        results = []
+        run = {}
+        def flush():
+            if run:
+                replies = self._fan_out({i: ("apply_batch", ([p for _, p in items],)) for i, items in run.items()})
+                for i, items in run.items():
+                    for (position, _), ok in zip(items, replies[i]):
+                        results[position] = ok
+                run.clear()
+        for posting in postings:
+            position = len(results)
+            results.append(False)
+            try:
+                shards = {self._shard_of(acc) for acc in posting[1:-1]} if len(posting) >= 3 else {None}
+            except (KeyError, TypeError):
+                continue
+            if None in shards:
+                continue
+            if len(shards) == 1:
+                run.setdefault(shards.pop(), []).append((position, posting))
+            elif posting[0] == "transfer" and len(posting) == 4:
+                flush()
+                try:
+                    results[position] = self.transfer_funds(*posting[1:])
+                except (TypeError, ValueError, OverflowError):
+                    pass
+        flush()
+        return results
+
+    def get_customer_accounts(self, customer_id):
+        accounts = [account_from_dict(d) for part in self._broadcast("get_customer_accounts", customer_id) for d in part]
+        accounts.sort(key=lambda a: int(a.account_number))
+        return accounts
+    list_customer_accounts = get_customer_accounts
+
+    def apply_all_interest(self, compounding_periods=1):
+        self._broadcast("apply_all_interest", compounding_periods)
+
+    def display_all_customers(self, out=None):
+        out = out or sys.stdout
+        parts = self._broadcast("customer_records")
+        for records in zip(*parts):
+            customer_id, name = records[0][:2]
+            count = sum(r[3] for r in records)
+            out.write(f"Cust ID: {customer_id}, Name: {name}, Accs: {count}\n")
+
+    def export_accounts(self, path, fmt="csv", **filters):
+        # Every shard writes its own part in parallel; the parts are then
+        # joined byte for byte, dropping the repeated header of each part.
+        parts = [f"{path}.shard{i}" for i in range(len(self._conns))]
+        replies = self._fan_out({i: ("export_accounts", (part, fmt, filters)) for i, part in enumerate(parts)})
+        with open(path, "wb") as out:
+            for i, part in enumerate(parts):
+                with open(part, "rb") as f:
+                    if i:
+                        _skip_report_header(f, fmt)
+                    shutil.copyfileobj(f, out, 1 << 20)
+                os.remove(part)
+        return sum(replies.values())
+
+def _skip_report_header(f, fmt):
+    if fmt == "csv":
+        f.readline()
+    elif fmt == "columnar":
+        f.read(len(_REPORT_MAGIC))
+        (count,), _ = _unpack_fields("q", f.read(8), 0)
+        for _ in range(2 * count):
+            (length,) = _U32.unpack(f.read(4))
+            f.read(length)
+
+class BankServer:
+    # Line-delimited JSON over a local socket. Each line is one request
+    # {"id": ..., "op": ..., "args": {...}} or a JSON array of them (a
+    # batch); the reply is one line holding the matching response or array.
+    # Requests on a connection may be pipelined: they are answered in order
+    # without waiting for the client to read earlier replies.
+    # A bank that journals (its group commits and checkpoints fsync) or is
+    # sharded (every call waits on a worker process) would stall the event
+    # loop, so by default its requests run on executor threads instead;
+    # each connection still gets its replies in order.
+    OPS = ("add_customer", "create_account", "deposit", "withdraw", "transfer_funds", "get_customer_accounts")
+    MAX_LINE = 1 << 20
+    def __init__(self, bank, offload=None, executor=None):
+        self._bank = bank
+        if offload is None:
+            offload = isinstance(bank, ShardedBank) or getattr(bank, "_journal", None) is not None
+        self._offload = offload
+        self._executor = executor
+
+    def handle(self, request):
+        if not isinstance(request, dict):
+            return {"id": None, "ok": False, "error": "request must be a JSON object"}
+        request_id = request.get("id")
+        op = request.get("op")
+        args = request.get("args") or {}
+        if op not in self.OPS:
+            return {"id": request_id, "ok": False, "error": f"unknown op {op!r}"}
+        try:
+            if op == "add_customer":
+                result = self._bank.add_customer(Customer(args["customer_id"], args.get("name", ""), args.get("address", "")))
+            elif op == "create_account":
+                account = self._bank.create_account(**args)
+                result = account.to_dict() if account else None
+            elif op == "get_customer_accounts":
+                result = [a.to_dict() for a in self._bank.list_customer_accounts(args["customer_id"])]
+            else:
+                result = getattr(self._bank, op)(**args)
+        except (KeyError, TypeError, AttributeError, ValueError, OverflowError, struct.error) as e:
+            # NaN and infinite amounts, which json.loads accepts, are refused
+            # with False by the bank; anything else a bad value raises ends
+            # up here.
+            return {"id": request_id, "ok": False, "error": f"bad arguments for {op}: {e}"}
+        if isinstance(result, VelocityRejection):
+            return {"id": request_id, "ok": False, "result": False, "error": "velocity limit", "reason": result._asdict()}
+        ok = result is not None and result is not False
+        return {"id": request_id, "ok": ok, "result": result}
+
+    def handle_line(self, line):
+        try:
+            request = json.loads(line)
+        except ValueError:
+            return {"id": None, "ok": False, "error": "invalid JSON"}
+        if isinstance(request, list):
+            return [self.handle(r) for r in request]
+        return self.handle(request)
+
+    def _handle_lines(self, lines):
+        return b"".join(json.dumps(self.handle_line(line)).encode() + b"\n" for line in lines)
+
+    async def _serve_client(self, reader, writer):
+        # Every complete line that has arrived is handled in one go (one
+        # executor hop when offloading), so pipelined requests share it.
+        loop = asyncio.get_running_loop()
+        partial = b""
+        try:
+            while True:
+                data = await reader.read(1 << 16)
+                if data:
+                    *lines, partial = (partial + data).split(b"\n")
+                    if len(partial) > self.MAX_LINE:
+                        writer.write(json.dumps({"id": None, "ok": False, "error": "request line too long"}).encode() + b"\n")
+                        break
+                else:
+                    lines, partial = [partial], b""
+                lines = [line for line in lines if line.strip()]
+                if lines:
+                    if self._offload:
+                        replies = await loop.run_in_executor(self._executor, self._handle_lines, lines)
+                    else:
+                        replies = self._handle_lines(lines)
+                    writer.write(replies)
+                    if writer.transport.get_write_buffer_size() > 65536:
+                        await writer.drain()
+                if not data:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host="127.0.0.1", port=8765, path=None):
+        if path is not None:
+            return await asyncio.start_unix_server(self._serve_client, path=path)
+        return await asyncio.start_server(self._serve_client, host, port)
+
+    async def serve_forever(self, host="127.0.0.1", port=8765, path=None):
+        server = await self.start(host, port, path)
+        async with server:
+            await server.serve_forever()
+
+async def _open_client(host, port, path):
+    if path is not None:
+        return await asyncio.open_unix_connection(path)
+    return await asyncio.open_connection(host, port)
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+async def run_load(host="127.0.0.1", port=8765, path=None, requests=20000, connections=8, pipeline=32, accounts=100, seed=0):
+    # Drives a running BankServer with a deposit/withdraw/transfer mix and
+    # reports latency percentiles (milliseconds) and throughput.
+    import random
+    rng = random.Random(seed)
+    reader, writer = await _open_client(host, port, path)
+    customer_id = f"load_{rng.getrandbits(32):08x}"
+    setup = [{"op": "add_customer", "args": {"customer_id": customer_id, "name": "Load", "address": "-"}}]
+    setup += [{"op": "create_account", "args": {"customer_id": customer_id, "account_type": "checking", "initial_balance": 1_000_000.0}}
+              for _ in range(accounts)]
+    writer.write(json.dumps(setup).encode() + b"\n")
+    await writer.drain()
+    replies = json.loads(await reader.readline())
+    account_numbers = [r["result"]["account_number"] for r in replies[1:]]
+    writer.close()
+
+    def make_request(i):
+        kind = rng.random()
+        if kind < 0.4:
+            return {"id": i, "op": "deposit", "args": {"account_number": rng.choice(account_numbers), "amount": 10.0}}
+        if kind < 0.7:
+            return {"id": i, "op": "withdraw", "args": {"account_number": rng.choice(account_numbers), "amount": 10.0}}
+        src, dst = rng.sample(account_numbers, 2)
+        return {"id": i, "op": "transfer_funds", "args": {"from_acc_num": src, "to_acc_num": dst, "amount": 5.0}}
+
+    latencies = []
+
+    async def drive(count):
+        reader, writer = await _open_client(host, port, path)
+        sent_at = []
+        for start in range(0, count, pipeline):
+            window = min(pipeline, count - start)
+            for i in range(start, start + window):
+                writer.write(json.dumps(make_request(i)).encode() + b"\n")
+                sent_at.append(time.perf_counter())
+            await writer.drain()
+            for _ in range(window):
+                await reader.readline()
+                latencies.append(time.perf_counter() - sent_at.pop(0))
+        writer.close()
+
+    per_connection = requests // connections
+    started = time.perf_counter()
+    await asyncio.gather(*(drive(per_connection) for _ in range(connections)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "seconds": elapsed,
+        "ops_per_sec": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": _percentile(latencies, 0.50) * 1000,
+        "p99_ms": _percentile(latencies, 0.99) * 1000,
+    }
+
+def run_menu(bank):
+    while True:
+        print("\nBanking System Menu:")
+        print("1. Add Customer")
+        print("2. Create Account")
+        print("3. Deposit")
+        print("4. Withdraw")
+        print("5. Transfer Funds")
+        print("6. View Customer Accounts")
+        print("7. Apply Interest")
+        print("8. Display All Customers")
+        print("9. Exit")    
+
+        choice = input("Enter your choice: ")
+
+        if choice == '1':
+            cid = input("Enter customer ID: ")
+            name = input("Enter customer name: ")
+            addr = input("Enter customer address: ")
+            if bank.add_customer(Customer(cid, name, addr)):
+                print("Customer added.")
+            else:
+                print("Failed to add customer (ID might be invalid or already exists).")
             
-    elif choice == '2':
-        cid = input("Enter customer ID: ")
-        atype = input("Enter account type (savings/checking): ").lower()
-        bal = float(input("Enter initial balance: "))
+        elif choice == '2':
+            cid = input("Enter customer ID: ")
+            atype = input("Enter account type (savings/checking): ").lower()
+            bal = float(input("Enter initial balance: "))
         
-        kwargs = {}
-        if atype == "savings":
-            kwargs["interest_rate"] = float(input("Enter interest rate (e.g., 5 for 5%): ")) / 100
-        elif atype == "checking":
-            kwargs["overdraft_limit"] = float(input("Enter overdraft limit (0.0): "))
-
-        acc = bank.create_account(cid, atype, bal, **kwargs)
-        if acc:
-            print(f"Account created: {acc.display_details()}")
-        else:
-            print("Failed to create account (customer not found or invalid account type).")
-
-    elif choice == '3' or choice == '4':
-        cid = input("Enter customer ID: ")
-        customer_accounts = bank.get_customer_accounts(cid)
-        if not customer_accounts:
-            print("No accounts found for this customer or customer ID invalid.")
-            continue
-
-        print(f"\nAccounts for Customer ID {cid}:")
-        for i, acc in enumerate(customer_accounts):
-            print(f"{i+1}. {acc.display_details()}")
+            kwargs = {}
+            if atype == "savings":
+                kwargs["interest_rate"] = float(input("Enter interest rate (e.g., 5 for 5%): ")) / 100
+            elif atype == "checking":
+                kwargs["overdraft_limit"] = float(input("Enter overdraft limit (0.0): "))
+
+            acc = bank.create_account(cid, atype, bal, **kwargs)
+            if acc:
+                print(f"Account created: {acc.display_details()}")
+            else:
+                print("Failed to create account (customer not found or invalid account type).")
+
+        elif choice == '3' or choice == '4':
+            cid = input("Enter customer ID: ")
+            customer_accounts = list(bank.get_customer_accounts(cid))
+            if not customer_accounts:
+                print("No accounts found for this customer or customer ID invalid.")
+                continue
+
+            print(f"\nAccounts for Customer ID {cid}:")
+            for i, acc in enumerate(customer_accounts):
+                print(f"{i+1}. {acc.display_details()}")
             
-        acc_choice = input("Select account number (from list above): ")
-        try:
-            acc_idx = int(acc_choice) - 1
-            if 0 <= acc_idx < len(customer_accounts):
-                selected_account = customer_accounts[acc_idx]
-                amount = float(input("Enter amount: "))
-                if choice == '3':
-                    if bank.deposit(selected_account.account_number, amount):
-                        print("Deposit successful.")
+            acc_choice = input("Select account number (from list above): ")
+            try:
+                acc_idx = int(acc_choice) - 1
+                if 0 <= acc_idx < len(customer_accounts):
+                    selected_account = customer_accounts[acc_idx]
+                    amount = float(input("Enter amount: "))
+                    if choice == '3':
+                        if bank.deposit(selected_account.account_number, amount):
+                            print("Deposit successful.")
+                        else:
+                            print("Deposit failed (invalid amount).")
                     else:
-                        print("Deposit failed (invalid amount).")
+                        result = bank.withdraw(selected_account.account_number, amount)
+                        if result:
+                            print("Withdrawal successful.")
+                        elif isinstance(result, VelocityRejection):
+                            print(f"Withdrawal refused by velocity limit '{result.rule}'.")
+                        else:
+                            print("Withdrawal failed (insufficient funds or invalid amount).")
                 else:
-                    if bank.withdraw(selected_account.account_number, amount):
-                        print("Withdrawal successful.")
-                    else:
-                        print("Withdrawal failed (insufficient funds or invalid amount).")
+                    print("Invalid account selection.")
+            except ValueError:
+                print("Invalid input.")
+
+        elif choice == '5':
+            from_acc_num = input("Enter source account number: ")
+            to_acc_num = input("Enter destination account number: ")
+            amt = float(input("Enter amount to transfer: "))
+            result = bank.transfer_funds(from_acc_num, to_acc_num, amt)
+            if result:
+                print("Transfer successful.")
+            elif isinstance(result, VelocityRejection):
+                print(f"Transfer refused by velocity limit '{result.rule}'.")
             else:
-                print("Invalid account selection.")
-        except ValueError:
-            print("Invalid input.")
-
-    elif choice == '5':
-        from_acc_num = input("Enter source account number: ")
-        to_acc_num = input("Enter destination account number: ")
-        amt = float(input("Enter amount to transfer: "))
-        if bank.transfer_funds(from_acc_num, to_acc_num, amt):
-            print("Transfer successful.")
-        else:
-            print("Transfer failed.")
-
-    elif choice == '6':
-        cid = input("Enter customer ID: ")
-        accs = bank.get_customer_accounts(cid)
-        if accs:
-            print(f"Accounts for Customer ID {cid}:")
-            for a in accs:
-                print(a.display_details())
+                print("Transfer failed.")
+
+        elif choice == '6':
+            cid = input("Enter customer ID: ")
+            accs = bank.get_customer_accounts(cid)
+            if accs:
+                print(f"Accounts for Customer ID {cid}:")
+                for a in accs:
+                    print(a.display_details())
+            else:
+                print("No accounts found for this customer or customer ID invalid.")
+
+        elif choice == '7':
+            bank.apply_all_interest()
+            print("Interest applied to all savings accounts.")
+
+        elif choice == '8':    
+            print("\nAll Customers:")
+            bank.display_all_customers()
+
+        elif choice == '9':    
+            print("Exiting Banking System...")
+            break
+
         else:
-            print("No accounts found for this customer or customer ID invalid.")
+            print("Invalid choice. Please try again.")
 
-    elif choice == '7':
-        bank.apply_all_interest()
-        print("Interest applied to all savings accounts.")
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Banking system")
+    parser.add_argument("mode", nargs="?", choices=("menu", "serve", "load"), default="menu")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", help="serve on / connect to this unix socket path instead of TCP")
+    parser.add_argument("--data-dir", help="persist the bank with a write-ahead log in this directory")
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--connections", type=int, default=8)
+    parser.add_argument("--pipeline", type=int, default=32)
+    parser.add_argument("--metrics-port", type=int, help="instrument the bank and serve Prometheus metrics on this port")
+    args = parser.parse_args(argv)
 
-    elif choice == '8':    
-        print("\nAll Customers:")
-        bank.display_all_customers()
+    if args.mode == "load":
+        stats = asyncio.run(run_load(args.host, args.port, args.unix, args.requests, args.connections, args.pipeline))
+        print(json.dumps(stats, indent=2))
+        return
 
-    elif choice == '9':    
-        print("Exiting Banking System...")
-        break
+    bank = Bank.recover(args.data_dir) if args.data_dir else Bank()
+    try:
+        if args.mode == "serve":
+            if args.metrics_port is not None:
+                from instrumentation import BANK_OPERATIONS, Metrics, instrument
+                metrics = Metrics("bank")
+                instrument(bank, metrics, BANK_OPERATIONS)
+                metrics.serve(args.host, args.metrics_port)
+            try:
+                asyncio.run(BankServer(bank).serve_forever(args.host, args.port, args.unix))
+            except KeyboardInterrupt:
+                pass
+        else:
+            run_menu(bank)
+    finally:
+        bank.close()
 
-    else:
-        print("Invalid choice. Please try again.")
+if __name__ == "__main__":
+    main()
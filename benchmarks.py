@@ -0,0 +1,852 @@
+import argparse
+import asyncio
+import cProfile
+import fnmatch
+import gc
+import importlib.util
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from array import array
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+def _load(name, relative_path):
+    # The cart module lives in a directory with a space in its name, so the
+    # modules are loaded by path rather than imported.
+    spec = importlib.util.spec_from_file_location(name, os.path.join(ROOT, relative_path))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+banking = _load("ashuabiranurag", "ashuabiranurag.py")
+shopping = _load("onlineshoppingcart", os.path.join("Advance Python workshop", "onlineshoppingcart.py"))
+
+SIZE_PROFILES = ("quick", "default", "full")
+SCENARIOS = {}
+
+def scenario(name, quick, default, full):
+    # Registers fn(runner, size, seed, workdir) under name; the three tuples
+    # are the sizes it runs at for each size profile.
+    def register(fn):
+        SCENARIOS[name] = (fn, {"quick": quick, "default": default, "full": full})
+        return fn
+    return register
+
+class Runner:
+    # Times one variant of a scenario: every repeat gets a fresh setup() and
+    # a full collection first, and the median is reported. A separate,
+    # untimed run under tracemalloc gives the memory figures, and another
+    # under cProfile writes a .prof file when profile_dir is set.
+    def __init__(self, repeats=5, memory=True, profile_dir=None, tracemalloc_top=0):
+        self.repeats = repeats
+        self.memory = memory
+        self.profile_dir = profile_dir
+        self.tracemalloc_top = tracemalloc_top
+        self.results = []
+        self.scenario = None
+        self.size = None
+
+    def measure(self, variant, run, setup=None, ops=1, repeats=None, memory=True, **extra):
+        timings = []
+        outcome = None
+        for _ in range(repeats or self.repeats):
+            state = setup() if setup is not None else None
+            gc.collect()
+            started = time.perf_counter()
+            outcome = run(state)
+            timings.append(time.perf_counter() - started)
+            state = None
+        median = statistics.median(timings)
+        result = {
+            "scenario": self.scenario,
+            "variant": variant,
+            "size": self.size,
+            "ops": ops,
+            "repeats": len(timings),
+            "median_s": median,
+            "min_s": min(timings),
+            "max_s": max(timings),
+            "ops_per_sec": ops / median if median else None,
+        }
+        if isinstance(outcome, dict):
+            result.update(outcome)
+        result.update(extra)
+        if self.memory and memory:
+            result.update(self._trace_memory(run, setup, ops))
+        if self.profile_dir:
+            result["profile"] = self._profile(variant, run, setup)
+        self.results.append(result)
+        print(f"  {self.scenario} {variant} size={self.size}: {median * 1000:.2f} ms", file=sys.stderr)
+        return result
+
+    def _trace_memory(self, run, setup, ops):
+        state = setup() if setup is not None else None
+        gc.collect()
+        tracemalloc.start()
+        try:
+            outcome = run(state)
+            current, peak = tracemalloc.get_traced_memory()
+            snapshot = tracemalloc.take_snapshot() if self.tracemalloc_top else None
+        finally:
+            tracemalloc.stop()
+        memory = {"peak_bytes": peak, "retained_bytes": current, "retained_bytes_per_op": current / ops if ops else None}
+        if snapshot is not None:
+            memory["top_allocations"] = [
+                {"site": str(stat.traceback), "bytes": stat.size, "count": stat.count}
+                for stat in snapshot.statistics("lineno")[:self.tracemalloc_top]
+            ]
+        del outcome, state
+        return memory
+
+    def _profile(self, variant, run, setup):
+        state = setup() if setup is not None else None
+        profiler = cProfile.Profile()
+        profiler.runcall(run, state)
+        os.makedirs(self.profile_dir, exist_ok=True)
+        path = os.path.join(self.profile_dir, f"{self.scenario}-{variant}-{self.size}.prof")
+        profiler.dump_stats(path)
+        return path
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+# --- Bank ---------------------------------------------------------------
+
+def make_bank(accounts, seed, bank=None):
+    # accounts accounts spread over accounts // 4 customers, half savings
+    # and half checking, every one opened with 1000 rupees.
+    rng = random.Random(seed)
+    bank = bank if bank is not None else banking.Bank()
+    customers = max(1, accounts // 4)
+    bank.bulk_add_customers((f"C{i}", f"Customer {i}", f"{i} Main Road") for i in range(customers))
+    numbers = []
+    for i in range(accounts):
+        if i % 2:
+            account = bank.create_account(f"C{i % customers}", "checking", 1000.0, overdraft_limit=500.0)
+        else:
+            account = bank.create_account(f"C{i % customers}", "savings", 1000.0, interest_rate=rng.choice((0.01, 0.02, 0.035)))
+        numbers.append(account.account_number)
+    return bank, numbers
+
+def make_postings(numbers, count, seed):
+    rng = random.Random(seed)
+    postings = []
+    for _ in range(count):
+        kind = rng.random()
+        if kind < 0.3:
+            postings.append(("deposit", rng.choice(numbers), rng.randrange(1, 50000) / 100))
+        elif kind < 0.6:
+            postings.append(("withdraw", rng.choice(numbers), rng.randrange(1, 50000) / 100))
+        else:
+            src, dst = rng.sample(numbers, 2)
+            postings.append(("transfer", src, dst, rng.randrange(1, 50000) / 100))
+    return postings
+
+def apply_per_call(bank, postings):
+    for posting in postings:
+        if posting[0] == "deposit":
+            bank.deposit(posting[1], posting[2])
+        elif posting[0] == "withdraw":
+            bank.withdraw(posting[1], posting[2])
+        else:
+            bank.transfer_funds(posting[1], posting[2], posting[3])
+
+def total_paise(bank):
+    return sum(account._balance for account in bank._slot_accounts)
+
+@scenario("bank.postings", quick=(10_000,), default=(100_000, 1_000_000), full=(100_000, 1_000_000, 10_000_000))
+def bench_postings(runner, size, seed, workdir):
+    bank, numbers = make_bank(min(size, 10_000), seed)
+    postings = make_postings(numbers, size, seed)
+    runner.measure("per_call", lambda _: apply_per_call(bank, postings), ops=size)
+    runner.measure("apply_batch", lambda _: bank.apply_batch(postings), ops=size)
+
+@scenario("bank.interest", quick=(10_000,), default=(10_000, 100_000, 1_000_000), full=(10_000, 1_000_000, 10_000_000))
+def bench_interest(runner, size, seed, workdir):
+    # size savings accounts among 2 * size. The baselines are the original
+    # loop (isinstance over every account) and the parallel-array pass
+    # apply_all_interest first used, both without locks or a ledger.
+    bank, _ = make_bank(2 * size, seed)
+
+    def isinstance_loop(_):
+        for account in bank._accounts.values():
+            if isinstance(account, banking.SavingsAccount):
+                account.apply_interest()
+
+    def array_columns(_):
+        savings = bank._accounts_by_type["savings"].values()
+        rates = array("d", [a._interest_rate for a in savings])
+        balances = array("q", [a._balance for a in savings])
+        growth = {rate: banking._interest_growth(rate, 1) for rate in set(rates)}
+        for i, rate in enumerate(rates):
+            balances[i] += round(balances[i] * growth[rate])
+        for account, balance in zip(savings, balances):
+            account._balance = balance
+
+    runner.measure("isinstance_loop", isinstance_loop, ops=size, memory=False)
+    runner.measure("array_columns", array_columns, ops=size)
+    runner.measure("apply_all_interest", lambda _: bank.apply_all_interest(), ops=size)
+    runner.measure("apply_all_interest_daily", lambda _: bank.apply_all_interest(30), ops=size)
+
+@scenario("bank.contention", quick=(1, 4), default=(1, 2, 4, 8), full=(1, 2, 4, 8, 16))
+def bench_contention(runner, size, seed, workdir):
+    # size threads hammer transfers over a shared set of accounts; the
+    # total held by the bank must not move.
+    transfers = 20_000
+    bank, numbers = make_bank(1000, seed)
+    before = total_paise(bank)
+
+    def run(_):
+        def worker(worker_seed):
+            rng = random.Random(worker_seed)
+            for _ in range(transfers):
+                src, dst = rng.sample(numbers, 2)
+                bank.transfer_funds(src, dst, rng.randrange(1, 200000) / 100)
+        threads = [threading.Thread(target=worker, args=(seed + i,)) for i in range(size)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        conserved = total_paise(bank) == before
+        if not conserved:
+            raise AssertionError("money was created or destroyed under contention")
+        return {"conserved": conserved}
+
+    runner.measure("transfer_funds", run, ops=size * transfers, memory=False)
+
+@scenario("bank.journal", quick=(10_000,), default=(100_000,), full=(1_000_000,))
+def bench_journal(runner, size, seed, workdir):
+    directory = os.path.join(workdir, "journal")
+
+    def fresh(journaled):
+        def setup():
+            shutil.rmtree(directory, ignore_errors=True)
+            bank = banking.Bank.recover(directory) if journaled else banking.Bank()
+            _, numbers = make_bank(1000, seed, bank)
+            return bank, make_postings(numbers, size, seed)
+        return setup
+
+    def run(state):
+        bank, postings = state
+        apply_per_call(bank, postings)
+        bank.close()
+
+    runner.measure("no_journal", run, fresh(False), ops=size, memory=False)
+    runner.measure("journal", run, fresh(True), ops=size, memory=False)
+    bank, postings = fresh(True)()
+    run((bank, postings))
+    log_bytes = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+
+    def recover(_):
+        banking.Bank.recover(directory).close()
+
+    runner.measure("recover", recover, ops=size, log_bytes=log_bytes)
+
+@scenario("bank.server", quick=(5_000,), default=(50_000,), full=(200_000,))
+def bench_server(runner, size, seed, workdir):
+    def run(_):
+        async def go():
+            server = await banking.BankServer(banking.Bank()).start("127.0.0.1", 0)
+            port = server.sockets[0].getsockname()[1]
+            async with server:
+                return await banking.run_load("127.0.0.1", port, requests=size, seed=seed)
+        return asyncio.run(go())
+
+    runner.measure("run_load", run, ops=size, repeats=min(runner.repeats, 3), memory=False)
+
+# The account and customer layout before __slots__ and integer paise: a
+# __dict__ per instance, float balances and a list of account numbers.
+class LegacyAccount:
+    def __init__(self, account_number, account_holder_id, balance=0.0):
+        self._account_number = account_number
+        self._balance = balance
+        self._account_holder_id = account_holder_id
+
+class LegacySavingsAccount(LegacyAccount):
+    def __init__(self, account_number, account_holder_id, balance=0.0, interest_rate=0.01):
+        super().__init__(account_number, account_holder_id, balance)
+        self._interest_rate = interest_rate
+
+class LegacyCheckingAccount(LegacyAccount):
+    def __init__(self, account_number, account_holder_id, balance=0.0, overdraft_limit=0.0):
+        super().__init__(account_number, account_holder_id, balance)
+        self._overdraft_limit = overdraft_limit
+
+class LegacyCustomer:
+    def __init__(self, customer_id, name, address):
+        self._customer_id = customer_id
+        self._name = name
+        self._address = address
+        self._account_numbers = []
+    def add_account_number(self, account_number):
+        if account_number not in self._account_numbers:
+            self._account_numbers.append(account_number)
+
+@scenario("bank.footprint", quick=(10_000,), default=(100_000, 1_000_000), full=(1_000_000, 10_000_000))
+def bench_footprint(runner, size, seed, workdir):
+    # The same size accounts (distinct balances, keyed by number) and
+    # size // 4 customers with four account numbers each, in the original
+    # __dict__/float layout and in the current slotted/paise one, measured
+    # apart; "create_accounts" is a whole Bank with its indexes.
+    customers = max(1, size // 4)
+
+    def accounts(savings_type, checking_type):
+        def run(holder):
+            rng = random.Random(seed)
+            accounts = {}
+            for i in range(size):
+                number, balance = str(1000 + i), rng.randrange(0, 10_000_000) / 100
+                if i % 2:
+                    accounts[number] = checking_type(number, f"C{i % customers}", balance, 500.0)
+                else:
+                    accounts[number] = savings_type(number, f"C{i % customers}", balance, rng.choice((0.01, 0.02, 0.035)))
+            holder.append(accounts)
+        return run
+
+    def holders(customer_type):
+        def run(holder):
+            people = {}
+            for i in range(customers):
+                customer = people[f"C{i}"] = customer_type(f"C{i}", f"Customer {i}", f"{i} Main Road")
+                for j in range(4):
+                    customer.add_account_number(str(1000 + i + j * customers))
+            holder.append(people)
+        return run
+
+    def bank(holder):
+        holder.append(make_bank(size, seed)[0])
+
+    variants = (
+        ("legacy_accounts", accounts(LegacySavingsAccount, LegacyCheckingAccount), size, "bytes_per_account"),
+        ("slotted_accounts", accounts(banking.SavingsAccount, banking.CheckingAccount), size, "bytes_per_account"),
+        ("legacy_customers", holders(LegacyCustomer), customers, "bytes_per_customer"),
+        ("slotted_customers", holders(banking.Customer), customers, "bytes_per_customer"),
+        ("create_accounts", bank, size, "bytes_per_account"),
+    )
+    for variant, run, count, label in variants:
+        result = runner.measure(variant, run, list, ops=count, repeats=1)
+        if "retained_bytes" in result:
+            result[label] = result["retained_bytes"] / count
+
+@scenario("bank.exactness", quick=(100_000,), default=(1_000_000,), full=(10_000_000,))
+def bench_exactness(runner, size, seed, workdir):
+    # Mixed postings checked against an integer paise model of the same
+    # rules: savings never go negative, checking stops at the overdraft.
+    def run(_):
+        bank, numbers = make_bank(1000, seed)
+        model = {number: bank._accounts[number]._balance for number in numbers}
+        floors = {number: bank._accounts[number]._withdraw_floor() for number in numbers}
+        for posting in make_postings(numbers, size, seed):
+            if posting[0] == "deposit":
+                ok = bank.deposit(posting[1], posting[2])
+                model[posting[1]] += round(posting[2] * 100)
+            elif posting[0] == "withdraw":
+                ok = bank.withdraw(posting[1], posting[2])
+                paise = round(posting[2] * 100)
+                if model[posting[1]] - paise >= floors[posting[1]]:
+                    model[posting[1]] -= paise
+            else:
+                ok = bank.transfer_funds(posting[1], posting[2], posting[3])
+                paise = round(posting[3] * 100)
+                if model[posting[1]] - paise >= floors[posting[1]]:
+                    model[posting[1]] -= paise
+                    model[posting[2]] += paise
+        exact = all(bank._accounts[number]._balance == balance for number, balance in model.items())
+        if not exact:
+            raise AssertionError("balances drifted from the integer model")
+        return {"exact": exact}
+
+    runner.measure("mixed_postings", run, ops=size, repeats=1, memory=False)
+
+@scenario("bank.import", quick=(10_000,), default=(100_000, 1_000_000), full=(1_000_000, 10_000_000))
+def bench_import(runner, size, seed, workdir):
+    rows = [(f"C{i}", f"Customer {i}", f"{i} Main Road") for i in range(size)]
+    path = os.path.join(workdir, "customers.csv")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("customer_id,name,address\n")
+        f.writelines(f"{c},{n},{a}\n" for c, n, a in rows)
+
+    def per_call(bank):
+        for row in rows:
+            bank.add_customer(banking.Customer(*row))
+
+    runner.measure("add_customer", per_call, banking.Bank, ops=size)
+    runner.measure("bulk_add_customers", lambda bank: bank.bulk_add_customers(rows), banking.Bank, ops=size)
+    runner.measure("bulk_add_customers_gc_paused", lambda bank: bank.bulk_add_customers(rows, pause_gc=True), banking.Bank, ops=size)
+    runner.measure("import_customers_csv", lambda bank: bank.import_customers_csv(path), banking.Bank, ops=size)
+
+@scenario("bank.reports", quick=(10_000,), default=(100_000,), full=(1_000_000,))
+def bench_reports(runner, size, seed, workdir):
+    bank, _ = make_bank(size, seed)
+    for fmt in ("csv", "jsonl", "columnar"):
+        path = os.path.join(workdir, f"accounts.{fmt}")
+        runner.measure(f"export_{fmt}", lambda _, fmt=fmt, path=path: bank.export_accounts(path, fmt), ops=size)
+        runner.results[-1]["file_bytes"] = os.path.getsize(path)
+
+@scenario("bank.ledger", quick=(100_000,), default=(1_000_000,), full=(10_000_000,))
+def bench_ledger(runner, size, seed, workdir):
+    bank, numbers = make_bank(1000, seed)
+    postings = make_postings(numbers, size, seed)
+    bank.attach_ledger(banking.TransactionLedger())
+    runner.measure("record", lambda _: bank.apply_batch(postings), ops=size, repeats=1)
+    rng = random.Random(seed)
+    ledger = bank.ledger
+    first, last = ledger.record(0)[0], ledger.record(len(ledger) - 1)[0]
+    queries = [(rng.choice(numbers), rng.uniform(first, last)) for _ in range(100_000)]
+
+    def as_of(_):
+        for number, timestamp in queries:
+            bank.balance_as_of(number, timestamp)
+
+    runner.measure("balance_as_of", as_of, ops=len(queries))
+
+@scenario("bank.velocity", quick=(100_000,), default=(1_000_000,), full=(1_000_000, 10_000_000))
+def bench_velocity(runner, size, seed, workdir):
+    # Per-call withdrawals and transfers with and without velocity rules
+    # (three per account, two per customer) loose enough never to refuse,
+    # so both runs do the same work apart from the checks.
+    bank, numbers = make_bank(size, seed)
+    postings = [p for p in make_postings(numbers, 200_000, seed) if p[0] != "deposit"]
+    runner.measure("debits_plain", lambda _: apply_per_call(bank, postings), ops=len(postings), memory=False)
+    runner.measure("apply_batch_plain", lambda _: bank.apply_batch(postings), ops=len(postings), memory=False)
+    Rule = banking.VelocityRule
+    limiter = banking.VelocityLimiter([
+        Rule("account_minute", "account", 60, 1e9, 10**6),
+        Rule("account_hour", "account", 3600, 1e9, 10**6),
+        Rule("account_day", "account", 86400, 1e10, 10**7),
+        Rule("customer_hour", "customer", 3600, 1e10, 10**7),
+        Rule("customer_day", "customer", 86400, 1e11, 10**8),
+    ])
+    bank.attach_velocity_limits(limiter)
+    runner.measure("debits_checked", lambda _: apply_per_call(bank, postings), ops=len(postings), memory=False)
+    runner.measure("apply_batch_checked", lambda _: bank.apply_batch(postings), ops=len(postings), memory=False)
+    bank.attach_velocity_limits(None)
+
+    def build(holder):
+        limiter = banking.VelocityLimiter([Rule("account_day", "account", 86400, 1e9, None)])
+        limiter._ensure(limiter._rules[0][-1], size - 1)
+        holder.append(limiter)
+
+    result = runner.measure("state_per_rule", build, list, ops=size, repeats=1)
+    if "retained_bytes" in result:
+        result["bytes_per_account_rule"] = result["retained_bytes"] / size
+
+@scenario("bank.shards", quick=(1, 2), default=(1, 2, 4, 8), full=(1, 2, 4, 8))
+def bench_shards(runner, size, seed, workdir):
+    with banking.ShardedBank(size) as bank:
+        bank.add_customer(banking.Customer("C0", "Customer 0", "0 Main Road"))
+        numbers = [bank.create_account("C0", "checking", 1000.0, overdraft_limit=500.0).account_number for _ in range(2000)]
+        postings = [p for p in make_postings(numbers, 200_000, seed) if p[0] != "transfer"]
+        transfers = make_postings(numbers, 2000, seed)
+        runner.measure("apply_batch", lambda _: bank.apply_batch(postings), ops=len(postings), memory=False)
+        runner.measure("mixed_apply_batch", lambda _: bank.apply_batch(transfers), ops=len(transfers), memory=False)
+
+# --- Shopping cart --------------------------------------------------------
+
+def make_products(count, seed):
+    rng = random.Random(seed)
+    words = ("Laptop", "Mouse", "Keyboard", "Cable", "Monitor", "Python", "Guide", "Licence", "Speaker", "Charger")
+    products = []
+    for i in range(count):
+        name = f"{rng.choice(words)} {rng.choice(words)} {i}"
+        price = rng.randrange(100, 10_000_000) / 100
+        kind = i % 3
+        if kind == 0:
+            products.append(shopping.PhysicalProduct(f"P{i}", name, price, 1_000_000, rng.randrange(1, 20_000) / 1000))
+        elif kind == 1:
+            products.append(shopping.DigitalProduct(f"P{i}", name, price, 1_000_000, f"https://example.com/d/{i}"))
+        else:
+            products.append(shopping.Product(f"P{i}", name, price, 1_000_000))
+    return products
+
+def make_inventory(products, **options):
+    options.setdefault("sweep_interval", None)
+    inventory = shopping.Inventory(**options)
+    for product in products:
+        inventory.add_product(product)
+    return inventory
+
+@scenario("cart.totals", quick=(100,), default=(100, 1_000, 10_000), full=(100, 10_000, 100_000))
+def bench_totals(runner, size, seed, workdir):
+    inventory = make_inventory(make_products(size, seed))
+    cart = shopping.ShoppingCart(inventory)
+    cart.apply_changes([("add", product_id, 1) for product_id in inventory.products])
+    calls = 10_000
+
+    def running(_):
+        for _ in range(calls):
+            cart.get_total()
+
+    def scan(_):
+        for _ in range(calls):
+            cart._scan_totals()
+
+    runner.measure("get_total", running, ops=calls)
+    runner.measure("full_scan", scan, ops=calls)
+    if not cart.check_consistency():
+        raise AssertionError("running cart totals disagree with a full scan")
+
+@scenario("cart.changes", quick=(1_000,), default=(1_000, 10_000), full=(10_000, 100_000))
+def bench_changes(runner, size, seed, workdir):
+    products = make_products(size, seed)
+    rng = random.Random(seed)
+    ops = [("add", f"P{rng.randrange(size)}", rng.randrange(1, 4)) for _ in range(size)]
+
+    def setup():
+        return shopping.ShoppingCart(make_inventory(products))
+
+    def per_call(cart):
+        for _, product_id, quantity in ops:
+            cart.add_item(product_id, quantity)
+
+    def per_call_printed(cart):
+        cart._echo = lambda message: print(message, file=sink)
+        per_call(cart)
+
+    def batch(cart):
+        if not cart.apply_changes(ops):
+            raise AssertionError("batch was rejected")
+
+    sink = io.StringIO()
+    runner.measure("add_item_echo", per_call_printed, setup, ops=size)
+    runner.measure("add_item", per_call, setup, ops=size)
+    runner.measure("apply_changes", batch, setup, ops=size)
+
+@scenario("cart.oversell", quick=(4,), default=(4, 16), full=(4, 16, 64))
+def bench_oversell(runner, size, seed, workdir):
+    # size threads race for a small stock with short reservation TTLs;
+    # stock sold plus stock left must equal the stock there was.
+    stock = 2000
+    products = [shopping.Product(f"P{i}", f"Item {i}", 10.0, stock) for i in range(10)]
+
+    def setup():
+        return make_inventory(products_copy(products), reservation_ttl=0.005, sweep_interval=0.001)
+
+    def run(inventory):
+        sold = [0] * size
+
+        def shopper(index):
+            rng = random.Random(seed + index)
+            cart = shopping.ShoppingCart(inventory)
+            for _ in range(2000):
+                cart.add_item(f"P{rng.randrange(10)}", rng.randrange(1, 5))
+                if rng.random() < 0.2:
+                    sold[index] += sum(line["quantity"] for line in cart.checkout()["lines"])
+                elif rng.random() < 0.05:
+                    time.sleep(0.01)
+            cart.clear()
+
+        threads = [threading.Thread(target=shopper, args=(i,)) for i in range(size)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        inventory.close()
+        remaining = sum(p.get_quantity_available() for p in inventory.products.values())
+        if sum(sold) + remaining != stock * len(products):
+            raise AssertionError("stock was oversold or lost")
+        return {"sold": sum(sold), "remaining": remaining}
+
+    runner.measure("threads", run, setup, ops=size * 2000, memory=False)
+
+def products_copy(products):
+    return [shopping.product_from_dict(p.to_dict()) for p in products]
+
+@scenario("cart.catalog", quick=(10_000,), default=(200_000,), full=(1_000_000,))
+def bench_catalog(runner, size, seed, workdir):
+    products = make_products(size, seed)
+    path = os.path.join(workdir, "catalog.store")
+    runner.measure("build", lambda _: shopping.CatalogStore.build(path, products), ops=size, repeats=1)
+    runner.results[-1]["file_bytes"] = os.path.getsize(path)
+    runner.measure("open", lambda _: shopping.CatalogStore(path).close(), ops=1)
+    store = shopping.CatalogStore(path)
+    rng = random.Random(seed)
+    ids = [f"P{rng.randrange(size)}" for _ in range(10_000)]
+    prefixes = [rng.choice(("Lap", "Mo", "Key", "Py", "Gui", "Spe")) for _ in range(1000)]
+    queries = [f"{rng.choice(('laptop', 'mouse', 'python'))} {rng.choice(('guide', 'cable', 'charger'))}" for _ in range(1000)]
+
+    def lookups(_):
+        for product_id in ids:
+            store.get(product_id)
+
+    def first_pages(query, terms):
+        def run(_):
+            for term in terms:
+                next(iter(query(term)), None)
+        return run
+
+    runner.measure("get", lookups, ops=len(ids))
+    runner.measure("search_prefix", first_pages(store.search_prefix, prefixes), ops=len(prefixes))
+    runner.measure("search_tokens", first_pages(store.search_tokens, queries), ops=len(queries))
+    runner.measure("price_range", lambda _: [next(iter(store.price_range(p, p + 500)), None) for p in range(0, 100_000, 100)], ops=1000)
+    runner.measure("iterate", lambda _: sum(1 for _ in store), ops=size, memory=False)
+    store.close()
+
+@scenario("cart.serialization", quick=(10_000,), default=(200_000,), full=(1_000_000,))
+def bench_serialization(runner, size, seed, workdir):
+    products = make_products(size, seed)
+    jsonl = os.path.join(workdir, "catalog.jsonl")
+    binary = os.path.join(workdir, "catalog.store")
+    runner.measure("jsonl_save", lambda _: shopping.save_catalog_jsonl(jsonl, products), ops=size, memory=False)
+    runner.results[-1]["file_bytes"] = os.path.getsize(jsonl)
+    runner.measure("jsonl_load", lambda _: sum(1 for _ in shopping.iter_catalog_jsonl(jsonl)), ops=size)
+    runner.measure("binary_save", lambda _: shopping.CatalogStore.build(binary, products), ops=size, memory=False)
+    runner.results[-1]["file_bytes"] = os.path.getsize(binary)
+
+    def binary_load(_):
+        store = shopping.CatalogStore(binary)
+        count = sum(1 for _ in store)
+        store.close()
+        return {"products": count}
+
+    runner.measure("binary_load", binary_load, ops=size)
+
+@scenario("cart.sessions", quick=(1_000,), default=(10_000, 100_000), full=(100_000, 1_000_000))
+def bench_sessions(runner, size, seed, workdir):
+    # size sessions with Zipf-like popularity; a tenth fit in memory.
+    inventory = make_inventory(make_products(1000, seed))
+    rng = random.Random(seed)
+    lookups = [(f"s{min(size - 1, int(rng.paretovariate(1.2)) - 1)}", f"P{rng.randrange(1000)}") for _ in range(100_000)]
+    path = os.path.join(workdir, "sessions")
+
+    def setup():
+        for name in os.listdir(workdir):
+            if name.startswith("sessions"):
+                os.remove(os.path.join(workdir, name))
+        return shopping.CartSessionStore(inventory, path, capacity=max(1, size // 10))
+
+    def run(store):
+        for session_id, product_id in lookups:
+            store.get(session_id).add_item(product_id, 1)
+        metrics = store.metrics()
+        for session_id in {session_id for session_id, _ in lookups}:
+            store.drop(session_id)
+        store.close()
+        return metrics
+
+    runner.measure("get_add", run, setup, ops=len(lookups))
+
+@scenario("cart.pricing", quick=(100,), default=(100, 10_000), full=(10_000, 100_000))
+def bench_pricing(runner, size, seed, workdir):
+    products = make_products(max(size, 1000), seed)
+    rng = random.Random(seed)
+
+    def rules():
+        pricing = shopping.PricingRules()
+        for i in range(size):
+            pricing.add_bulk_discount(f"P{rng.randrange(len(products))}", rng.randrange(2, 10), rng.randrange(1, 30))
+        pricing.add_category_promotion("digital", 10)
+        pricing.set_tax_rate(18)
+        pricing.set_tax_rate(5, "digital")
+        pricing.add_coupon("SAVE10", percent=10, min_subtotal=500)
+        for kg in (1, 5, 10, 20):
+            pricing.add_shipping_slab(kg, 40 * kg)
+        pricing.set_shipping_overflow(per_kg=30, free_over=100_000)
+        return pricing
+
+    runner.measure("compile", lambda pricing: pricing.compile(), rules, ops=size)
+    engine = rules().compile()
+    inventory = make_inventory(products)
+    cart = shopping.ShoppingCart(inventory, engine)
+    cart.apply_changes([("add", f"P{i}", 1) for i in range(50)])
+    cart.apply_coupon("SAVE10")
+    updates = [(f"P{rng.randrange(50)}", rng.randrange(1, 12)) for _ in range(10_000)]
+
+    def reprice(_):
+        for product_id, quantity in updates:
+            cart.update_quantity(product_id, quantity)
+            cart.quote()
+
+    runner.measure("update_and_quote", reprice, ops=len(updates))
+
+@scenario("cart.checkout", quick=(2_000,), default=(20_000,), full=(200_000,))
+def bench_checkout(runner, size, seed, workdir):
+    # Orders placed from four threads and fulfilled by four workers;
+    # latency runs from placing an order to its fulfilment being logged.
+    products = make_products(1000, seed)
+    inventory = make_inventory(products)
+    path = os.path.join(workdir, "orders.jsonl")
+
+    def run_with(fsync):
+        def setup():
+            if os.path.exists(path):
+                os.remove(path)
+            return shopping.OrderLog(path, fsync=fsync)
+
+        def run(order_log):
+            placed = {}
+            latencies = []
+            pipeline = shopping.CheckoutPipeline(
+                order_log, inventory.products, workers=4, queue_size=256,
+                on_fulfilled=lambda order, entitlements, manifest: latencies.append(time.perf_counter() - placed[order["order_id"]]))
+            per_thread = size // 4
+
+            def shopper(index):
+                rng = random.Random(seed + index)
+                for i in range(per_thread):
+                    cart = shopping.ShoppingCart(inventory)
+                    cart.apply_changes([("add", f"P{rng.randrange(1000)}", rng.randrange(1, 3)) for _ in range(3)])
+                    started = time.perf_counter()
+                    order = pipeline.checkout(cart, f"{index}-{i}")
+                    placed.setdefault(order["order_id"], started)
+
+            threads = [threading.Thread(target=shopper, args=(i,)) for i in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            pipeline.join()
+            pipeline.close()
+            order_log.close()
+            latencies.sort()
+            return {"orders": len(latencies), "p50_ms": _percentile(latencies, 0.5) * 1000, "p99_ms": _percentile(latencies, 0.99) * 1000}
+
+        return setup, run
+
+    setup, run = run_with(False)
+    runner.measure("pipeline", run, setup, ops=size // 4 * 4, memory=False)
+    setup, run = run_with(True)
+    runner.measure("pipeline_fsync", run, setup, ops=size // 4 * 4, memory=False)
+
+# --- Instrumentation -----------------------------------------------------
+
+@scenario("instrumentation.overhead", quick=(100_000,), default=(1_000_000,), full=(10_000_000,))
+def bench_instrumentation(runner, size, seed, workdir):
+    # The same calls on a plain and an instrumented object; the difference
+    # per op is what instrumentation costs.
+    import instrumentation
+    bank, numbers = make_bank(1000, seed)
+    rng = random.Random(seed)
+    deposits = [(rng.choice(numbers), 1.0) for _ in range(size)]
+
+    def run(_):
+        deposit = bank.deposit
+        for number, amount in deposits:
+            deposit(number, amount)
+
+    runner.measure("bank_deposit_plain", run, ops=size, memory=False)
+    metrics = instrumentation.Metrics("bank")
+    instrumentation.instrument(bank, metrics, instrumentation.BANK_OPERATIONS)
+    runner.measure("bank_deposit_instrumented", run, ops=size, memory=False)
+    runner.measure("prometheus_text", lambda _: metrics.prometheus_text(), ops=1)
+    instrumentation.uninstrument(bank)
+
+    inventory = make_inventory([shopping.Product("P0", "Item", 10.0, 10 * size)])
+    cart = shopping.ShoppingCart(inventory)
+    calls = size // 10
+
+    def churn(_):
+        for _ in range(calls):
+            cart.add_item("P0", 1)
+            cart.update_quantity("P0", 1)
+
+    runner.measure("cart_update_plain", churn, ops=2 * calls, memory=False)
+    instrumentation.instrument(cart, instrumentation.Metrics("cart"), instrumentation.CART_OPERATIONS)
+    runner.measure("cart_update_instrumented", churn, ops=2 * calls, memory=False)
+
+# --- Driver ----------------------------------------------------------------
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def select(patterns):
+    if not patterns:
+        return list(SCENARIOS)
+    return [name for name in SCENARIOS if any(fnmatch.fnmatch(name, p) or p in name for p in patterns)]
+
+def run_benchmarks(names, profile="default", repeats=5, seed=0, memory=True, profile_dir=None, tracemalloc_top=0):
+    runner = Runner(repeats, memory, profile_dir, tracemalloc_top)
+    started = time.time()
+    for name in names:
+        fn, sizes = SCENARIOS[name]
+        for size in sizes[profile]:
+            runner.scenario, runner.size = name, size
+            workdir = tempfile.mkdtemp(prefix="bench-")
+            try:
+                fn(runner, size, seed, workdir)
+            finally:
+                shutil.rmtree(workdir, ignore_errors=True)
+    return {
+        "meta": {
+            "started": started,
+            "commit": _git_commit(),
+            "python": sys.version,
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "profile": profile,
+            "repeats": repeats,
+            "seed": seed,
+        },
+        "results": runner.results,
+    }
+
+def compare(old, new, threshold):
+    # Prints the median-time ratio of every (scenario, variant, size) the
+    # two runs share; returns the ones slower than threshold.
+    baseline = {(r["scenario"], r["variant"], r["size"]): r for r in old["results"]}
+    regressions = []
+    for result in new["results"]:
+        key = (result["scenario"], result["variant"], result["size"])
+        if key not in baseline or not baseline[key]["median_s"]:
+            continue
+        ratio = result["median_s"] / baseline[key]["median_s"]
+        flag = "  SLOWER" if ratio > threshold else ""
+        print(f"{key[0]:<20} {key[1]:<26} {key[2]:>10} {ratio:7.2f}x{flag}", file=sys.stderr)
+        if ratio > threshold:
+            regressions.append(key)
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks for the Bank and ShoppingCart hot paths")
+    parser.add_argument("patterns", nargs="*", help="run only scenarios matching these names or globs")
+    parser.add_argument("--list", action="store_true", help="list scenarios and their sizes")
+    parser.add_argument("--size", choices=SIZE_PROFILES, default="default")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON results here instead of stdout")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    parser.add_argument("--tracemalloc-top", type=int, default=0, help="record the top N allocation sites per variant")
+    parser.add_argument("--profile", metavar="DIR", help="write a cProfile .prof file per variant to DIR")
+    parser.add_argument("--compare", metavar="JSON", help="compare against an earlier results file")
+    parser.add_argument("--threshold", type=float, default=1.10, help="ratio that counts as a regression")
+    args = parser.parse_args(argv)
+
+    names = select(args.patterns)
+    if args.list:
+        for name in names:
+            print(name, " ".join(f"{p}={list(SCENARIOS[name][1][p])}" for p in SIZE_PROFILES))
+        return 0
+
+    results = run_benchmarks(names, args.size, args.repeats, args.seed, not args.no_memory, args.profile, args.tracemalloc_top)
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            if compare(json.load(f), results, args.threshold):
+                return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,233 @@
+import functools
+import http.server
+import os
+import threading
+import time
+from array import array
+
+# Operations instrumented by default. Anything not listed is left alone,
+# and objects that are never instrumented pay nothing at all.
+BANK_OPERATIONS = ("add_customer", "remove_customer", "create_account", "deposit", "withdraw",
+                   "transfer_funds", "apply_batch", "apply_all_interest")
+CART_OPERATIONS = ("add_item", "remove_item", "update_quantity", "apply_changes", "clear", "checkout")
+
+# Latencies are kept in nanoseconds in log-linear buckets, HDR style: each
+# power of two is split into 2**SUB_BUCKET_BITS equal buckets, so a bucket
+# is within 1/8 of the values it holds from a nanosecond up to ~2**40 ns.
+SUB_BUCKET_BITS = 3
+_SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+_BUCKETS = (41 - SUB_BUCKET_BITS) * _SUB_BUCKETS
+
+# Bounds (seconds) the Prometheus export folds the fine buckets into.
+EXPORT_BOUNDS = (1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4,
+                 1e-3, 2.5e-3, 5e-3, 1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _bucket_upper(index):
+    # Largest value (ns) that lands in bucket index.
+    if index < _SUB_BUCKETS:
+        return index
+    shift = (index >> SUB_BUCKET_BITS) - 1
+    return (((index & (_SUB_BUCKETS - 1)) + _SUB_BUCKETS + 1) << shift) - 1
+
+def _outcome(result):
+    # False means the operation was refused, and a VelocityRejection that a
+    # velocity limit refused it; None is an operation with nothing to
+    # return, such as clear() or apply_all_interest(). A CartChangeReport
+    # that was turned down for lack of stock counts as a stock-out.
+    if result is True or result is None:
+        return "ok"
+    if result is False:
+        return "failed"
+    if not result and hasattr(result, "rule"):
+        # A VelocityRejection: falsy, and names the rule that refused.
+        return "velocity_rejected"
+    errors = getattr(result, "errors", None)
+    if errors and any(change.error == "insufficient_stock" for change in errors):
+        return "stock_out"
+    return "failed" if errors else "ok"
+
+def _created(result):
+    # For operations that return what they made, or None when they refuse.
+    return "failed" if result is None else "ok"
+
+# Classifiers for operations _outcome would misread; the rest use _outcome.
+CLASSIFIERS = {"create_account": _created}
+
+class _Shard:
+    # One thread's counters: op -> [latency buckets, total ns, {outcome:
+    # count}]. Only its own thread writes to it, so recording takes no
+    # lock; readers merge all shards.
+    def __init__(self):
+        self.ops = {}
+        self.depth = 0
+        self.nested = None
+
+    def record(self, op, outcome, nanoseconds):
+        entry = self.ops.get(op)
+        if entry is None:
+            entry = self.ops[op] = [[0] * _BUCKETS, 0, {}]
+        if nanoseconds < _SUB_BUCKETS:
+            index = nanoseconds if nanoseconds > 0 else 0
+        else:
+            shift = nanoseconds.bit_length() - SUB_BUCKET_BITS - 1
+            index = ((shift + 1) << SUB_BUCKET_BITS) + (nanoseconds >> shift) - _SUB_BUCKETS
+            if index >= _BUCKETS:
+                index = _BUCKETS - 1
+        entry[0][index] += 1
+        entry[1] += nanoseconds
+        counts = entry[2]
+        counts[outcome] = counts.get(outcome, 0) + 1
+
+class Metrics:
+    # Operation counters and latency histograms for any number of
+    # instrumented objects, exported in the Prometheus text format.
+    def __init__(self, namespace="app"):
+        self.namespace = namespace
+        self._local = threading.local()
+        self._shards = []
+        self._lock = threading.Lock()
+
+    def _shard(self):
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = _Shard()
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+
+    def record(self, op, outcome, seconds):
+        self._shard().record(op, outcome, int(seconds * 1e9))
+
+    def snapshot(self):
+        # {"counts": {(op, outcome): n}, "histograms": {op: (buckets, sum_ns)}}
+        with self._lock:
+            shards = list(self._shards)
+        counts = {}
+        histograms = {}
+        for shard in shards:
+            for op, (buckets, total, outcomes) in list(shard.ops.items()):
+                for outcome, count in list(outcomes.items()):
+                    counts[op, outcome] = counts.get((op, outcome), 0) + count
+                merged = histograms.get(op)
+                if merged is None:
+                    histograms[op] = (array("q", buckets), total)
+                else:
+                    merged_buckets = merged[0]
+                    for i, count in enumerate(buckets):
+                        if count:
+                            merged_buckets[i] += count
+                    histograms[op] = (merged_buckets, merged[1] + total)
+        return {"counts": counts, "histograms": histograms}
+
+    def percentile(self, op, fraction):
+        # Latency (seconds) below which fraction of op's calls fell.
+        histogram = self.snapshot()["histograms"].get(op)
+        if histogram is None:
+            return None
+        buckets = histogram[0]
+        target = fraction * sum(buckets)
+        seen = 0
+        for index, count in enumerate(buckets):
+            seen += count
+            if count and seen >= target:
+                return _bucket_upper(index) / 1e9
+        return None
+
+    def prometheus_text(self):
+        snapshot = self.snapshot()
+        name = f"{self.namespace}_operations_total"
+        lines = [f"# HELP {name} Instrumented operations by outcome.", f"# TYPE {name} counter"]
+        for (op, outcome), count in sorted(snapshot["counts"].items()):
+            lines.append(f'{name}{{op="{op}",outcome="{outcome}"}} {count}')
+        name = f"{self.namespace}_operation_duration_seconds"
+        lines += [f"# HELP {name} Instrumented operation latency.", f"# TYPE {name} histogram"]
+        for op, (buckets, total) in sorted(snapshot["histograms"].items()):
+            cumulative = 0
+            index = 0
+            for bound in EXPORT_BOUNDS:
+                limit = bound * 1e9
+                while index < _BUCKETS and _bucket_upper(index) <= limit:
+                    cumulative += buckets[index]
+                    index += 1
+                lines.append(f'{name}_bucket{{op="{op}",le="{bound:g}"}} {cumulative}')
+            count = sum(buckets)
+            lines.append(f'{name}_bucket{{op="{op}",le="+Inf"}} {count}')
+            lines.append(f'{name}_sum{{op="{op}"}} {total / 1e9:.9f}')
+            lines.append(f'{name}_count{{op="{op}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        # Written to a temporary file and renamed, so a scraper reading
+        # path (e.g. node_exporter's textfile collector) never sees half.
+        temporary = f"{path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            f.write(self.prometheus_text())
+        os.replace(temporary, path)
+
+    def serve(self, host="127.0.0.1", port=9100):
+        # Serves GET /metrics from a daemon thread; returns the server, whose
+        # shutdown() stops it.
+        metrics = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus_text().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = http.server.ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+def instrument(obj, metrics, operations, classify=CLASSIFIERS):
+    # Wraps the named methods of obj (one instance, not its class) so every
+    # call is counted and timed. Calls an instrumented method makes into
+    # another one, such as add_item into apply_changes, are only counted
+    # once, at the outermost call; a stock-out seen by the inner call is
+    # still reported as one. classify maps an operation to the function
+    # that turns its result into an outcome. uninstrument() restores obj.
+    clock = time.perf_counter_ns
+    local = metrics._local
+    for op in operations:
+        method = getattr(obj, op)
+
+        def wrapper(*args, _op=op, _method=method, _classify=classify.get(op, _outcome), **kwargs):
+            try:
+                shard = local.shard
+            except AttributeError:
+                shard = metrics._shard()
+            if shard.depth:
+                result = _method(*args, **kwargs)
+                shard.nested = _classify(result)
+                return result
+            shard.depth += 1
+            shard.nested = None
+            started = clock()
+            outcome = "error"
+            try:
+                result = _method(*args, **kwargs)
+                outcome = _classify(result)
+                if outcome == "failed" and shard.nested == "stock_out":
+                    outcome = "stock_out"
+                return result
+            finally:
+                shard.depth -= 1
+                shard.record(_op, outcome, clock() - started)
+
+        setattr(obj, op, functools.wraps(method)(wrapper))
+    obj._instrumented_operations = tuple(operations)
+    return obj
+
+def uninstrument(obj):
+    for op in obj.__dict__.pop("_instrumented_operations", ()):
+        obj.__dict__.pop(op, None)
+    return obj
@@ -0,0 +1,30 @@
+import importlib.util
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _load(name, relative_path):
+    # The cart module lives in a directory with a space in its name, so the
+    # modules are loaded by path rather than imported.
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.spec_from_file_location(name, os.path.join(ROOT, relative_path))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+@pytest.fixture(scope="session")
+def banking():
+    return _load("ashuabiranurag", "ashuabiranurag.py")
+
+@pytest.fixture(scope="session")
+def shopping():
+    return _load("onlineshoppingcart", os.path.join("Advance Python workshop", "onlineshoppingcart.py"))
+
+@pytest.fixture(scope="session")
+def instrumentation():
+    return _load("instrumentation", "instrumentation.py")
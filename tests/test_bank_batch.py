@@ -0,0 +1,40 @@
+def _bank(banking):
+    bank = banking.Bank()
+    bank.add_customer(banking.Customer("C0", "Customer 0", "0 Main Road"))
+    first = bank.create_account("C0", "savings", 10.0).account_number
+    second = bank.create_account("C0", "checking", 10.0, overdraft_limit=5.0).account_number
+    return bank, first, second
+
+def test_malformed_and_out_of_range_postings_get_false(banking):
+    bank, first, second = _bank(banking)
+    postings = [
+        ("deposit", first, 5.0),
+        ("deposit", first, 1e17),
+        ("transfer", first, second, 9.3e16),
+        ("withdraw", first, float("nan")),
+        ("deposit", first, float("inf")),
+        ("deposit", "missing", 1.0),
+        ("transfer", first, 1.0),
+        ("refund", first, 1.0),
+        (),
+        None,
+        ("deposit", first, "5"),
+        ("deposit", first, -1.0),
+        ("transfer", second, first, 14.0),
+    ]
+    assert bank.apply_batch(postings) == [True] + [False] * 11 + [True]
+    assert bank._accounts[first].balance == 29.0
+    assert bank._accounts[second].balance == -4.0
+
+def test_batch_matches_the_same_postings_made_one_by_one(banking):
+    bank, first, second = _bank(banking)
+    other, first_copy, second_copy = _bank(banking)
+    postings = [("withdraw", first, 7.0), ("withdraw", first, 7.0), ("transfer", second, first, 12.0),
+                ("transfer", second, first, 12.0), ("deposit", second, 0.01), ("transfer", first, first, 1.0)]
+    results = bank.apply_batch(postings)
+    for posting, result in zip(postings, results):
+        method = getattr(other, posting[0] if posting[0] != "transfer" else "transfer_funds")
+        renamed = [{first: first_copy, second: second_copy}.get(value, value) for value in posting[1:]]
+        assert method(*renamed) == result
+    assert bank._accounts[first].balance == other._accounts[first_copy].balance
+    assert bank._accounts[second].balance == other._accounts[second_copy].balance
@@ -0,0 +1,100 @@
+import random
+import threading
+
+def _bank(banking, accounts):
+    bank = banking.Bank()
+    bank.add_customer(banking.Customer("C0", "Customer 0", "0 Main Road"))
+    numbers = []
+    for i in range(accounts):
+        if i % 2:
+            account = bank.create_account("C0", "checking", 1000.0, overdraft_limit=500.0)
+        else:
+            account = bank.create_account("C0", "savings", 1000.0)
+        numbers.append(account.account_number)
+    return bank, numbers
+
+def _total_paise(bank):
+    return sum(account._balance for account in bank._slot_accounts)
+
+def _run(threads):
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(60)
+        assert not thread.is_alive(), "worker did not finish (deadlock?)"
+
+def test_transfers_conserve_money_under_contention(banking):
+    # Few accounts and many threads, so most transfers collide; amounts are
+    # often larger than a balance, so refusals race with successes too. An
+    # auditor holding every stripe lock must never see a transfer half done.
+    bank, numbers = _bank(banking, 8)
+    before = _total_paise(bank)
+    outcomes = []
+    audits = []
+    done = threading.Event()
+
+    def worker(seed):
+        rng = random.Random(seed)
+        ok = 0
+        for _ in range(5000):
+            src, dst = rng.sample(numbers, 2)
+            ok += bool(bank.transfer_funds(src, dst, rng.randrange(1, 200000) / 100))
+        outcomes.append(ok)
+
+    def auditor():
+        while not done.is_set():
+            with banking._holding(bank._locks):
+                audits.append(_total_paise(bank))
+
+    audit = threading.Thread(target=auditor)
+    audit.start()
+    try:
+        _run([threading.Thread(target=worker, args=(i,)) for i in range(8)])
+    finally:
+        done.set()
+        audit.join()
+    assert _total_paise(bank) == before
+    assert audits and set(audits) == {before}
+    assert 0 < sum(outcomes) < 8 * 5000
+    for number in numbers:
+        account = bank._accounts[number]
+        assert account._balance >= account._withdraw_floor()
+
+def test_opposite_transfers_and_batches_do_not_deadlock(banking):
+    bank, (a, b) = _bank(banking, 2)
+    before = _total_paise(bank)
+
+    def forth():
+        for _ in range(5000):
+            bank.transfer_funds(a, b, 1.0)
+
+    def back():
+        for _ in range(2500):
+            bank.apply_batch([("transfer", b, a, 1.0), ("transfer", b, a, 1.0)])
+
+    _run([threading.Thread(target=forth), threading.Thread(target=back)])
+    assert _total_paise(bank) == before
+
+def test_deposits_and_withdrawals_are_not_lost(banking):
+    bank, numbers = _bank(banking, 4)
+    before = _total_paise(bank)
+
+    def worker():
+        for i in range(4000):
+            number = numbers[i % len(numbers)]
+            assert bank.deposit(number, 2.5)
+            assert bank.withdraw(number, 1.25)
+
+    _run([threading.Thread(target=worker) for _ in range(6)])
+    assert _total_paise(bank) == before + 6 * 4000 * 125
+
+def test_account_numbers_are_unique_across_threads(banking):
+    bank, _ = _bank(banking, 0)
+    created = []
+
+    def worker():
+        created.extend(bank.create_account("C0", "savings").account_number for _ in range(500))
+
+    _run([threading.Thread(target=worker) for _ in range(8)])
+    assert len(set(created)) == len(created) == 4000
+    assert len(list(bank.get_customer_accounts("C0"))) == 4000
@@ -0,0 +1,70 @@
+import random
+
+def test_balances_stay_exact_after_a_million_mixed_operations(banking):
+    # Every operation is mirrored on an integer paise model of the account
+    # rules; the bank must agree with it to the paisa at the end.
+    rng = random.Random(7)
+    bank = banking.Bank()
+    bank.add_customer(banking.Customer("C0", "Customer 0", "0 Main Road"))
+    model, floors, rates = {}, {}, {}
+    for i in range(1000):
+        if i % 2:
+            account = bank.create_account("C0", "checking", 1000.0, overdraft_limit=500.0)
+            floors[account.account_number] = -50000
+        else:
+            rate = rng.choice((0.01, 0.02, 0.035))
+            account = bank.create_account("C0", "savings", 1000.0, interest_rate=rate)
+            floors[account.account_number] = 0
+            rates[account.account_number] = rate
+        model[account.account_number] = 100000
+    numbers = list(model)
+
+    for step in range(1, 1_000_001):
+        paise = rng.randrange(1, 50000)
+        kind = rng.random()
+        if kind < 0.3:
+            number = rng.choice(numbers)
+            assert bank.deposit(number, paise / 100)
+            model[number] += paise
+        elif kind < 0.6:
+            number = rng.choice(numbers)
+            allowed = model[number] - paise >= floors[number]
+            assert bool(bank.withdraw(number, paise / 100)) == allowed
+            if allowed:
+                model[number] -= paise
+        else:
+            src, dst = rng.sample(numbers, 2)
+            allowed = model[src] - paise >= floors[src]
+            assert bool(bank.transfer_funds(src, dst, paise / 100)) == allowed
+            if allowed:
+                model[src] -= paise
+                model[dst] += paise
+        if step % 100_000 == 0:
+            bank.apply_all_interest()
+            for number, rate in rates.items():
+                model[number] += round(model[number] * rate)
+
+    assert {number: bank._accounts[number]._balance for number in numbers} == model
+    assert all(bank._accounts[number].balance == model[number] / 100 for number in numbers)
+
+def test_repeated_small_deposits_do_not_drift(banking):
+    bank = banking.Bank()
+    bank.add_customer(banking.Customer("C0", "Customer 0", "0 Main Road"))
+    number = bank.create_account("C0", "checking").account_number
+    for _ in range(100_000):
+        bank.deposit(number, 0.1)
+    assert bank._accounts[number].balance == 10000.0
+    assert sum(0.1 for _ in range(100_000)) != 10000.0
+
+def test_non_finite_amounts_are_refused(banking):
+    bank = banking.Bank()
+    bank.add_customer(banking.Customer("C0", "Customer 0", "0 Main Road"))
+    savings = bank.create_account("C0", "savings", 10.0).account_number
+    checking = bank.create_account("C0", "checking", 10.0, overdraft_limit=5.0).account_number
+    for amount in (float("nan"), float("inf"), float("-inf"), 1e307):
+        assert bank.deposit(savings, amount) is False
+        assert bank.withdraw(checking, amount) is False
+        assert bank.transfer_funds(checking, savings, amount) is False
+    bank._accounts[checking].overdraft_limit = float("inf")
+    assert bank._accounts[checking].overdraft_limit == 5.0
+    assert bank._accounts[savings].balance == 10.0 and bank._accounts[checking].balance == 10.0
@@ -0,0 +1,29 @@
+import gc
+
+def test_malformed_rows_are_reported_not_raised(banking):
+    bank = banking.Bank()
+    rows = [("C1", "Asha", "1 Main Road"), 5, None, "abc", ("C2",), ["C3", "Ravi", 3], {"C4": 1, "x": 2, "y": 3},
+            iter(["C5", "Meera", "5 Main Road"]), ("C 6", "Dev", "6 Main Road"), ("C1", "Asha", "1 Main Road")]
+    report = bank.bulk_add_customers(rows)
+    assert report.added == 2
+    assert [(r.row, r.customer_id, r.reason) for r in report.rejects] == [
+        (2, None, "malformed"), (3, None, "malformed"), (4, None, "malformed"), (5, "C2", "malformed"),
+        (6, "C3", "malformed"), (7, None, "malformed"), (9, "C 6", "invalid_id"), (10, "C1", "duplicate"),
+    ]
+    assert sorted(bank._customers) == ["C1", "C5"]
+
+def test_gc_is_only_paused_on_request(banking):
+    bank = banking.Bank()
+    states = []
+
+    def rows(prefix):
+        for i in range(3):
+            states.append(gc.isenabled())
+            yield (f"{prefix}{i}", "Name", "Address")
+
+    bank.bulk_add_customers(rows("A"))
+    assert states == [True] * 3
+    states.clear()
+    bank.bulk_add_customers(rows("B"), pause_gc=True)
+    assert states == [False] * 3
+    assert gc.isenabled()
@@ -0,0 +1,84 @@
+import os
+import shutil
+import time
+
+import pytest
+
+def _crash_copy(directory, tmp_path):
+    # What a crash right now would leave on disk: the files as they are,
+    # without close() committing the buffer.
+    copy = os.path.join(tmp_path, "crashed")
+    shutil.copytree(directory, copy)
+    return copy
+
+def test_acknowledged_deposit_reaches_disk_within_max_delay(banking, tmp_path):
+    directory = str(tmp_path / "bank")
+    bank = banking.Bank.recover(directory, max_delay=0.01)
+    try:
+        bank.add_customer(banking.Customer("C1", "Asha", "1 Main Road"))
+        number = bank.create_account("C1", "checking", 10.0).account_number
+        assert bank.deposit(number, 2.5)
+        time.sleep(0.2)
+        recovered = banking.Bank.recover(_crash_copy(directory, tmp_path))
+        assert recovered._accounts[number].balance == 12.5
+        recovered.close()
+    finally:
+        bank.close()
+
+def test_rejected_arguments_leave_the_log_readable(banking, tmp_path):
+    directory = str(tmp_path / "bank")
+    bank = banking.Bank.recover(directory)
+    server = banking.BankServer(bank)
+    assert server.handle({"op": "add_customer", "args": {"customer_id": "C1", "name": "Asha"}})["ok"]
+    bad = {"customer_id": "C1", "account_type": "savings", "initial_balance": 5.0, "interest_rate": "x"}
+    assert not server.handle({"op": "create_account", "args": bad})["ok"]
+    reply = server.handle({"op": "create_account", "args": {"customer_id": "C1", "account_type": "savings", "initial_balance": 5.0}})
+    assert reply["ok"]
+    bank.close()
+
+    recovered = banking.Bank.recover(directory)
+    assert [a.account_number for a in recovered.get_customer_accounts("C1")] == [reply["result"]["account_number"]]
+    recovered.close()
+
+def test_unreadable_record_is_treated_as_a_torn_tail(banking, tmp_path):
+    directory = str(tmp_path / "bank")
+    bank = banking.Bank.recover(directory)
+    bank.add_customer(banking.Customer("C1", "Asha", "1 Main Road"))
+    bank.close()
+    wal = os.path.join(directory, "wal.00000000")
+    good = os.path.getsize(wal)
+    with open(wal, "ab") as f:
+        # A zero-length create_account record with a valid CRC.
+        f.write(banking._WAL_HEADER.pack(banking._WAL_OPS["create_account"][0], 0, 0))
+
+    recovered = banking.Bank.recover(directory)
+    assert "C1" in recovered._customers
+    recovered.close()
+    assert os.path.getsize(wal) == good
+
+def test_batch_that_raises_leaves_log_and_limits_untouched(banking, tmp_path):
+    class FailingLimiter(banking.VelocityLimiter):
+        # Admits the first debit and raises on the second.
+        calls = 0
+        def admit(self, *args):
+            self.calls += 1
+            if self.calls == 2:
+                raise RuntimeError("limiter unavailable")
+            return super().admit(*args)
+
+    directory = str(tmp_path / "bank")
+    bank = banking.Bank.recover(directory)
+    bank.add_customer(banking.Customer("C1", "Asha", "1 Main Road"))
+    number = bank.create_account("C1", "savings", 10.0).account_number
+    limiter = FailingLimiter([banking.VelocityRule("burst", "account", 3600, None, 1)])
+    bank.attach_velocity_limits(limiter)
+    with pytest.raises(RuntimeError):
+        bank.apply_batch([("deposit", number, 5.0), ("withdraw", number, 1.0), ("withdraw", number, 1.0)])
+    assert bank._accounts[number].balance == 10.0
+    # The refunded debit leaves room under the one-debit limit.
+    assert bank.withdraw(number, 2.0) is True
+    bank.close()
+
+    recovered = banking.Bank.recover(directory)
+    assert recovered._accounts[number].balance == 8.0
+    recovered.close()
@@ -0,0 +1,52 @@
+import os
+
+def test_point_in_time_balances_across_spilled_segments(banking, tmp_path):
+    now = [100.0]
+    spill_dir = str(tmp_path / "ledger")
+    ledger = banking.TransactionLedger(segment_size=4, spill_dir=spill_dir, clock=lambda: now[0])
+    bank = banking.Bank()
+    bank.add_customer(banking.Customer("C0", "Customer 0", "0 Main Road"))
+    a = bank.create_account("C0", "savings", 1000.0, interest_rate=0.01).account_number
+    b = bank.create_account("C0", "checking", 50.0).account_number
+    bank.attach_ledger(ledger)
+    slot_a, slot_b = bank._slots[a], bank._slots[b]
+    history = {}
+
+    def step(timestamp, action):
+        now[0] = timestamp
+        action()
+        history[timestamp] = (bank._accounts[a]._balance, bank._accounts[b]._balance)
+
+    step(100.0, lambda: None)
+    step(101.0, lambda: bank.deposit(a, 5.0))
+    step(102.0, lambda: bank.apply_batch([("withdraw", a, 1.0), ("transfer", a, b, 2.0), ("deposit", b, 3.0)]))
+    step(103.0, bank.apply_all_interest)
+    step(104.0, lambda: bank.transfer_funds(b, a, 4.5))
+    # A clock that steps back does not reorder the history.
+    now[0] = 103.5
+    bank.withdraw(b, 1.0)
+    history[104.0] = (bank._accounts[a]._balance, bank._accounts[b]._balance)
+
+    assert len(ledger) == 11
+    assert isinstance(ledger._segments[0][0], memoryview) and isinstance(ledger._segments[1][0], memoryview)
+    assert len(os.listdir(spill_dir)) == 2
+
+    assert ledger.balance_as_of(slot_a, 99.0) == 0
+    for timestamp, (balance_a, balance_b) in history.items():
+        assert ledger.balance_as_of(slot_a, timestamp) == balance_a
+        assert ledger.balance_as_of(slot_b, timestamp) == balance_b
+        assert ledger.balance_as_of(slot_a, timestamp + 0.5) == balance_a
+    assert ledger.balance_as_of(99, 104.0) == 0
+
+    K = banking.TransactionLedger
+    assert list(ledger.account_postings(slot_a, 101.0, 104.0)) == [
+        (101.0, 500, K.DEPOSIT), (102.0, -100, K.WITHDRAW), (102.0, -200, K.TRANSFER_OUT), (103.0, 1002, K.INTEREST)]
+    assert [kind for _, _, kind in ledger.account_postings(slot_b)] == [
+        K.OPEN, K.TRANSFER_IN, K.DEPOSIT, K.TRANSFER_OUT, K.WITHDRAW]
+    assert list(ledger.postings_between(102.0, 103.0)) == [
+        (102.0, slot_a, -100, K.WITHDRAW), (102.0, slot_a, -200, K.TRANSFER_OUT),
+        (102.0, slot_b, 200, K.TRANSFER_IN), (102.0, slot_b, 300, K.DEPOSIT)]
+    assert [record[0] for record in ledger.postings_between(104.0, 105.0)] == [104.0, 104.0, 104.0]
+
+    ledger.close()
+    assert os.listdir(spill_dir) == []
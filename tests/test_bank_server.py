@@ -0,0 +1,56 @@
+import asyncio
+import json
+import threading
+
+def _exchange(banking, bank, payload):
+    async def go():
+        server = await banking.BankServer(bank).start("127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(payload)
+            writer.write_eof()
+            data = await reader.read()
+            writer.close()
+            return [json.loads(line) for line in data.splitlines()]
+    return asyncio.run(go())
+
+def test_bad_amounts_are_refused_and_keep_the_connection(banking, tmp_path):
+    bank = banking.Bank.recover(str(tmp_path / "bank"))
+    bank.add_customer(banking.Customer("C1", "Asha", "1 Main Road"))
+    number = bank.create_account("C1", "checking", 10.0).account_number
+    lines = [
+        {"id": 1, "op": "deposit", "args": {"account_number": number, "amount": float("nan")}},
+        {"id": 2, "op": "withdraw", "args": {"account_number": number, "amount": float("inf")}},
+        {"id": 3, "op": "create_account", "args": {"customer_id": "C1", "account_type": "savings", "interest_rate": "x"}},
+        {"id": 4, "op": "deposit", "args": {"account_number": number, "amount": 5.0}},
+    ]
+    # json.dumps writes NaN and Infinity, which json.loads accepts.
+    replies = _exchange(banking, bank, "".join(json.dumps(line) + "\n" for line in lines).encode())
+    bank.close()
+    assert [reply["id"] for reply in replies] == [1, 2, 3, 4]
+    assert [reply["ok"] for reply in replies] == [False, False, False, True]
+    assert replies[0]["result"] is False and replies[1]["result"] is False
+
+def test_last_line_without_newline_is_answered(banking):
+    bank = banking.Bank()
+    replies = _exchange(banking, bank, b'{"id": 1, "op": "add_customer", "args": {"customer_id": "C1"}}\n\n{"id": 2, "op": "nope"}')
+    assert [reply["id"] for reply in replies] == [1, 2]
+    assert replies[0]["ok"] and not replies[1]["ok"]
+
+def test_account_listing_races_account_creation(banking):
+    bank = banking.Bank()
+    bank.add_customer(banking.Customer("C1", "Asha", "1 Main Road"))
+    server = banking.BankServer(bank)
+
+    def create():
+        for _ in range(5000):
+            bank.create_account("C1", "checking", 1.0)
+
+    creator = threading.Thread(target=create)
+    creator.start()
+    request = {"op": "get_customer_accounts", "args": {"customer_id": "C1"}}
+    while creator.is_alive():
+        assert server.handle(request)["ok"]
+    creator.join()
+    assert len(server.handle(request)["result"]) == 5000
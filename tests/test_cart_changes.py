@@ -0,0 +1,16 @@
+def test_malformed_operations_are_reported_and_nothing_applies(shopping):
+    cart = shopping.ShoppingCart()
+    ops = [("add", "P1", 1), (), 5, ("add",), {"add": "P1"}, ("add", ["P1"], 1), "add", None, ("add", "P3", 2)]
+    report = cart.apply_changes(ops)
+    assert not report
+    assert [change.index for change in report.errors] == [1, 2, 3, 4, 5, 6, 7]
+    assert {change.error for change in report.errors} == {"malformed"}
+    assert cart.get_item_count() == 0
+    assert cart.catalog["P1"].get_quantity_available() == 10
+    assert cart.describe_change(report.errors[0]) == "Cart operation 2 is malformed."
+
+def test_single_item_methods_refuse_bad_input_without_raising(shopping):
+    cart = shopping.ShoppingCart()
+    assert not cart.add_item(["P1"], 1)
+    assert not cart.update_quantity("P1", "2")
+    assert cart.add_item("P1", 2) and cart.get_item_count() == 2
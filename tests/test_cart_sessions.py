@@ -0,0 +1,39 @@
+def _store(shopping, tmp_path, capacity):
+    inventory = shopping.Inventory(sweep_interval=None)
+    for i in range(3):
+        inventory.add_product(shopping.Product(f"P{i}", f"Item {i}", 10.0, 100))
+    return inventory, shopping.CartSessionStore(inventory, str(tmp_path / "sessions"), capacity=capacity)
+
+def test_carts_in_use_are_not_spilled(shopping, tmp_path):
+    inventory, store = _store(shopping, tmp_path, capacity=2)
+    with store.session("a") as cart:
+        cart.add_item("P0", 5)
+        for name in ("b", "c", "d"):
+            store.get(name).add_item("P1", 1)
+        assert cart.add_item("P0", 1)
+        assert store.metrics()["in_use"] == 1
+        assert list(store._sessions) == ["a", "d"]
+    assert len(store) == 2
+    assert store.get("a").get_item_count() == 6
+    spilled = store.metrics()["spilled"]
+    store.close()
+    assert spilled == 2
+    assert inventory.products["P0"].get_quantity_available() == 94
+
+def test_store_exceeds_capacity_only_while_every_cart_is_in_use(shopping, tmp_path):
+    _, store = _store(shopping, tmp_path, capacity=1)
+    with store.session("a"), store.session("b"):
+        assert len(store) == 2
+    assert len(store) == 1
+    store.close()
+
+def test_spilled_count_follows_spills_reloads_and_drops(shopping, tmp_path):
+    _, store = _store(shopping, tmp_path, capacity=1)
+    for name in ("a", "b", "c"):
+        store.get(name).add_item("P2", 1)
+    assert store.metrics()["spilled"] == 2
+    store.get("a")
+    assert store.metrics()["spilled"] == 2
+    assert store.drop("b") and store.drop("c")
+    assert store.metrics()["spilled"] == 0
+    store.close()
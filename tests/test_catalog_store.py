@@ -0,0 +1,67 @@
+import pytest
+
+def _products(shopping):
+    return [
+        shopping.Product("B2", "Blue Mug", 249.5, 10),
+        shopping.PhysicalProduct("A1", "Desk Lamp", 1299.0, 3, 1.25),
+        shopping.DigitalProduct("C3", "desk planner", 99.0, 1000, "https://example.com/planner"),
+        shopping.PhysicalProduct("D4", "Desk Chair", 4999.0, 2, 12.0),
+        shopping.Product("E5", "Blue Pen", 15.0, 500),
+    ]
+
+@pytest.fixture
+def store(shopping, tmp_path):
+    path = str(tmp_path / "catalog.store")
+    shopping.CatalogStore.build(path, _products(shopping))
+    store = shopping.CatalogStore(path)
+    yield store
+    store.close()
+
+def _ids(pages):
+    return [product.get_product_id() for page in pages for product in page]
+
+def test_get_round_trips_every_type(shopping, store):
+    assert len(store) == 5
+    for original in _products(shopping):
+        assert store.get(original.get_product_id()).to_dict() == original.to_dict()
+    assert store.get("Z9") is None and store.get("") is None
+    assert [p.to_dict() for p in store] == [p.to_dict() for p in _products(shopping)]
+
+def test_queries(store):
+    assert _ids(store.search_prefix("desk")) == ["D4", "A1", "C3"]
+    assert _ids(store.search_prefix("DESK L")) == ["A1"]
+    assert _ids(store.search_prefix("zebra")) == []
+    assert sorted(_ids(store.search_tokens("blue"))) == ["B2", "E5"]
+    assert _ids(store.search_tokens("pen BLUE")) == ["E5"]
+    assert _ids(store.search_tokens("blue lamp")) == [] and _ids(store.search_tokens("")) == []
+    assert _ids(store.price_range(99.0, 1299.0)) == ["C3", "B2", "A1"]
+    assert _ids(store.price_range(high=20)) == ["E5"] and _ids(store.price_range(low=5000)) == []
+    assert _ids(store.by_type("physical")) == ["A1", "D4"]
+    assert _ids(store.by_type("digital")) == ["C3"] and _ids(store.by_type("nope")) == []
+    assert [len(page) for page in store.pages(page_size=2)] == [2, 2, 1]
+
+def test_empty_catalog(shopping, tmp_path):
+    path = str(tmp_path / "empty.store")
+    shopping.CatalogStore.build(path, [])
+    store = shopping.CatalogStore(path)
+    assert len(store) == 0 and list(store) == [] and store.get("A1") is None
+    assert _ids(store.search_prefix("a")) == [] and _ids(store.search_tokens("a")) == []
+    assert _ids(store.price_range(0, 10)) == [] and _ids(store.by_type("product")) == []
+    store.close()
+
+def test_close_with_unfinished_page_iterators(shopping, tmp_path):
+    path = str(tmp_path / "catalog.store")
+    shopping.CatalogStore.build(path, _products(shopping))
+    store = shopping.CatalogStore(path)
+    iterators = [store.price_range(0, 10000, page_size=1), store.search_prefix("", page_size=1),
+                 store.search_tokens("blue", page_size=1), store.by_type("physical", page_size=1),
+                 store.pages(page_size=1)]
+    rows = iter(store)
+    for iterator in iterators + [rows]:
+        next(iterator)
+    store.close()
+    for iterator in iterators:
+        with pytest.raises(ValueError):
+            next(iterator)
+    # The block already decoded is finished; the store is not read again.
+    assert len(list(rows)) == 4
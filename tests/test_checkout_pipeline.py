@@ -0,0 +1,96 @@
+import queue
+import threading
+
+import pytest
+
+def _cart(shopping):
+    cart = shopping.ShoppingCart()
+    assert cart.add_item("P1", 1)
+    return cart
+
+def test_retry_after_queue_full_enqueues_the_recorded_order(shopping, tmp_path):
+    log = shopping.OrderLog(str(tmp_path / "orders.jsonl"), fsync=False)
+    started = threading.Event()
+    release = threading.Event()
+    fulfilled = []
+
+    def on_fulfilled(order, entitlements, manifest):
+        started.set()
+        release.wait(5)
+        fulfilled.append(order["order_id"])
+
+    catalog = shopping.ShoppingCart().catalog
+    pipeline = shopping.CheckoutPipeline(log, catalog, workers=1, queue_size=1, on_fulfilled=on_fulfilled)
+    try:
+        pipeline.checkout(_cart(shopping), "k1")
+        assert started.wait(5)
+        pipeline.checkout(_cart(shopping), "k2")
+        with pytest.raises(queue.Full):
+            pipeline.checkout(_cart(shopping), "k3", timeout=0.05)
+        order = log.get("O3")
+        assert order is not None and order in log.pending()
+
+        release.set()
+        assert pipeline.checkout(shopping.ShoppingCart(), "k3") is order
+        pipeline.join()
+        assert sorted(fulfilled) == ["O1", "O2", "O3"]
+
+        # Neither a retry after fulfilment nor one while queued adds a duplicate.
+        pipeline.checkout(shopping.ShoppingCart(), "k3")
+        pipeline.join()
+        assert sorted(fulfilled) == ["O1", "O2", "O3"]
+        assert log.pending() == []
+    finally:
+        release.set()
+        pipeline.close()
+        log.close()
+
+def test_worker_survives_failing_orders(shopping, tmp_path):
+    log = shopping.OrderLog(str(tmp_path / "orders.jsonl"), fsync=False)
+    record_fulfillment = log.record_fulfillment
+    errors = []
+    fulfilled = []
+
+    def flaky_record(order_id, entitlements, manifest):
+        if order_id == "O2" and not any(e[0] == "O2" for e in errors):
+            raise OSError("disk full")
+        record_fulfillment(order_id, entitlements, manifest)
+
+    def on_fulfilled(order, entitlements, manifest):
+        if order["order_id"] == "O1":
+            raise RuntimeError("callback failed")
+        fulfilled.append(order["order_id"])
+
+    log.record_fulfillment = flaky_record
+    catalog = shopping.ShoppingCart().catalog
+    pipeline = shopping.CheckoutPipeline(log, catalog, workers=1, queue_size=1, on_fulfilled=on_fulfilled,
+                                         on_error=lambda order, error: errors.append((order["order_id"], type(error))))
+    try:
+        for key in ("k1", "k2", "k3"):
+            pipeline.checkout(_cart(shopping), key, timeout=5)
+            pipeline.join()
+        assert errors == [("O1", RuntimeError), ("O2", OSError)]
+        assert fulfilled == ["O3"]
+        # O1 was recorded before its callback failed; O2 was not, so a
+        # retry queues it again.
+        assert [order["order_id"] for order in log.pending()] == ["O2"]
+        pipeline.checkout(shopping.ShoppingCart(), "k2", timeout=5)
+        pipeline.join()
+        assert fulfilled == ["O3", "O2"] and log.pending() == []
+    finally:
+        pipeline.close()
+        log.close()
+
+def test_errors_without_a_handler_go_to_stderr(shopping, tmp_path, capsys):
+    log = shopping.OrderLog(str(tmp_path / "orders.jsonl"), fsync=False)
+
+    def on_fulfilled(order, entitlements, manifest):
+        raise RuntimeError("callback failed")
+
+    pipeline = shopping.CheckoutPipeline(log, shopping.ShoppingCart().catalog, workers=1, on_fulfilled=on_fulfilled)
+    pipeline.checkout(_cart(shopping), "k1")
+    pipeline.join()
+    pipeline.close()
+    log.close()
+    err = capsys.readouterr().err
+    assert "Fulfilling order O1 failed" in err and "RuntimeError: callback failed" in err
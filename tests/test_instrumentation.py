@@ -0,0 +1,39 @@
+def _counts(metrics):
+    return metrics.snapshot()["counts"]
+
+def test_operations_returning_none_are_not_failures(banking, shopping, instrumentation):
+    metrics = instrumentation.Metrics("bank")
+    bank = instrumentation.instrument(banking.Bank(), metrics, instrumentation.BANK_OPERATIONS)
+    bank.add_customer(banking.Customer("C0", "Customer 0", "0 Main Road"))
+    assert bank.create_account("C0", "savings", 100.0) is not None
+    assert bank.create_account("C0", "bogus", 100.0) is None
+    bank.apply_all_interest()
+    counts = _counts(metrics)
+    assert counts["create_account", "ok"] == 1
+    assert counts["create_account", "failed"] == 1
+    assert counts["apply_all_interest", "ok"] == 1
+    assert ("apply_all_interest", "failed") not in counts
+
+    metrics = instrumentation.Metrics("cart")
+    cart = instrumentation.instrument(shopping.ShoppingCart(), metrics, instrumentation.CART_OPERATIONS)
+    cart.add_item("P1", 1)
+    cart.clear()
+    assert _counts(metrics) == {("add_item", "ok"): 1, ("clear", "ok"): 1}
+
+def test_velocity_refusals_have_their_own_outcome(banking, instrumentation):
+    metrics = instrumentation.Metrics("bank")
+    bank = instrumentation.instrument(banking.Bank(), metrics, instrumentation.BANK_OPERATIONS)
+    bank.attach_velocity_limits(banking.VelocityLimiter([banking.VelocityRule("burst", "account", 60, None, 1)]))
+    bank.add_customer(banking.Customer("C0", "Customer 0", "0 Main Road"))
+    first = bank.create_account("C0", "savings", 1000.0).account_number
+    second = bank.create_account("C0", "savings", 1000.0).account_number
+    assert bank.withdraw(first, 10.0) is True
+    rejection = bank.withdraw(first, 10.0)
+    assert not rejection and rejection.rule == "burst"
+    assert not bank.transfer_funds(first, second, 10.0)
+    assert bank.withdraw(second, 5000.0) is False
+    counts = _counts(metrics)
+    assert counts["withdraw", "ok"] == 1
+    assert counts["withdraw", "velocity_rejected"] == 1
+    assert counts["withdraw", "failed"] == 1
+    assert counts["transfer_funds", "velocity_rejected"] == 1
@@ -0,0 +1,96 @@
+import random
+import threading
+
+def _run(threads):
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(120)
+        assert not thread.is_alive(), "shopper did not finish (deadlock?)"
+
+def test_concurrent_carts_never_oversell(shopping):
+    # Sixteen carts race for a little stock while short reservation TTLs
+    # expire lines under them; what was sold plus what is left must be
+    # exactly the stock there was, and no product may ever go negative.
+    stock = 500
+    inventory = shopping.Inventory(reservation_ttl=0.005, sweep_interval=0.001)
+    for i in range(5):
+        inventory.add_product(shopping.Product(f"P{i}", f"Item {i}", 10.0, stock))
+    sold = [0] * 16
+    lows = []
+    done = threading.Event()
+
+    def shopper(index):
+        rng = random.Random(index)
+        cart = shopping.ShoppingCart(inventory)
+        for _ in range(1500):
+            product_id = f"P{rng.randrange(5)}"
+            action = rng.random()
+            if action < 0.5:
+                cart.add_item(product_id, rng.randrange(1, 6))
+            elif action < 0.7:
+                cart.update_quantity(product_id, rng.randrange(0, 8))
+            elif action < 0.75:
+                cart.clear()
+            else:
+                sold[index] += sum(line["quantity"] for line in cart.checkout()["lines"])
+        cart.clear()
+
+    def auditor():
+        while not done.is_set():
+            lows.append(min(p.get_quantity_available() for p in inventory.products.values()))
+
+    audit = threading.Thread(target=auditor)
+    audit.start()
+    try:
+        _run([threading.Thread(target=shopper, args=(i,)) for i in range(16)])
+    finally:
+        done.set()
+        audit.join()
+        inventory.close()
+    inventory.expire_due()
+    remaining = sum(p.get_quantity_available() for p in inventory.products.values())
+    assert 0 < sum(sold) <= 5 * stock
+    assert sum(sold) + remaining == 5 * stock
+    assert min(lows) >= 0
+
+def test_batched_changes_never_oversell(shopping):
+    inventory = shopping.Inventory(sweep_interval=None)
+    inventory.add_product(shopping.Product("P0", "Item", 10.0, 100))
+    carts = [shopping.ShoppingCart(inventory) for _ in range(8)]
+    applied = []
+
+    def shopper(cart):
+        for _ in range(200):
+            report = cart.apply_changes([("add", "P0", 3), ("update", "P0", 7)])
+            applied.append(bool(report))
+            if report:
+                cart.remove_item("P0")
+
+    _run([threading.Thread(target=shopper, args=(cart,)) for cart in carts])
+    assert inventory.products["P0"].get_quantity_available() == 100
+    held = [cart._line_quantity("P0") for cart in carts]
+    assert held == [0] * 8 and any(applied)
+
+def test_cart_without_inventory_starts_no_thread(shopping):
+    before = threading.active_count()
+    carts = [shopping.ShoppingCart() for _ in range(20)]
+    assert threading.active_count() == before
+    assert carts[0].add_item("P1", 1)
+
+def test_adjust_rejects_bad_quantities_and_releases_at_zero(shopping):
+    inventory = shopping.Inventory(sweep_interval=None)
+    product = shopping.Product("P0", "Item", 10.0, 10)
+    inventory.add_product(product)
+    reservation = inventory.reserve("P0", 5)
+    for bad in (-5, -1, 2.5, "3", None):
+        assert inventory.adjust(reservation, bad) is False
+    assert product.get_quantity_available() == 5
+    assert inventory.reserve("P0", 6) is None
+
+    assert inventory.adjust(reservation, 8) and product.get_quantity_available() == 2
+    assert inventory.adjust(reservation, 0)
+    assert product.get_quantity_available() == 10
+    assert inventory.adjust(reservation, 1) is False
+    assert inventory.commit(reservation) is False
+    assert product.get_quantity_available() == 10
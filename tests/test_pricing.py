@@ -0,0 +1,63 @@
+def _engine(shopping):
+    rules = shopping.PricingRules()
+    rules.add_category_promotion("physical", 10)
+    rules.add_bulk_discount("B1", 3, 5)
+    rules.add_bulk_discount("B1", 10, 15)
+    rules.add_bulk_discount("H1", 2, 20)
+    rules.set_tax_rate(5)
+    rules.set_tax_rate(18, "physical")
+    rules.set_tax_rate(12, "digital")
+    rules.add_coupon("save", percent=10, amount=50, min_subtotal=1000)
+    rules.add_shipping_slab(1, 40)
+    rules.add_shipping_slab(2, 70)
+    rules.set_shipping_overflow(per_kg=25, free_over=10000)
+    return rules.compile()
+
+def _cart(shopping, engine, lines, coupon="SAVE"):
+    inventory = shopping.Inventory(sweep_interval=None)
+    inventory.add_product(shopping.Product("B1", "Book", 500.0, 100))
+    inventory.add_product(shopping.PhysicalProduct("H1", "Headphones", 2000.0, 100, 0.8))
+    inventory.add_product(shopping.DigitalProduct("D1", "Ebook", 300.0, 100, "https://example.com/ebook"))
+    cart = shopping.ShoppingCart(inventory, engine)
+    for product_id, quantity in lines:
+        assert cart.add_item(product_id, quantity)
+    assert cart.apply_coupon(coupon)
+    return cart
+
+def test_worked_example(shopping):
+    engine = _engine(shopping)
+    cart = _cart(shopping, engine, [("B1", 3), ("H1", 1), ("D1", 2)])
+    # B1: 1500.00 gross, 3-unit tier 5% = 75.00, taxed 5%.
+    # H1: 2000.00 gross, category 10% = 200.00 (tier not reached), taxed 18%.
+    # D1: 600.00 gross, no discount, taxed 12%.
+    # Coupon on 3825.00 net: 10% + 50 = 432.50, spread over the rates in
+    # proportion: 161.12 / 203.52 / 67.84, so tax is
+    # 5% of 1263.88 + 18% of 1596.48 + 12% of 532.16 = 63.19 + 287.37 + 63.86.
+    # 0.8 kg ships in the 1 kg slab.
+    assert cart.quote() == {"subtotal": 4100.0, "discount": 275.0, "coupon": 432.5,
+                            "tax": 414.42, "shipping": 40.0, "total": 3846.92}
+
+    # Two headphones reach the 20% tier, which beats the 10% promotion;
+    # 1.6 kg ships in the 2 kg slab.
+    assert cart.update_quantity("H1", 2)
+    assert cart.quote() == {"subtotal": 6100.0, "discount": 875.0, "coupon": 572.5,
+                            "tax": 640.44, "shipping": 70.0, "total": 5362.94}
+
+    # 2.4 kg is one started kilogram over the last slab.
+    assert cart.remove_item("B1") and cart.remove_item("D1") and cart.update_quantity("H1", 3)
+    assert cart.quote() == {"subtotal": 6000.0, "discount": 1200.0, "coupon": 530.0,
+                            "tax": 768.6, "shipping": 95.0, "total": 5133.6}
+
+    # 10030.00 after the coupon reaches the free-shipping threshold.
+    assert cart.update_quantity("H1", 7)
+    assert cart.quote() == {"subtotal": 14000.0, "discount": 2800.0, "coupon": 1170.0,
+                            "tax": 1805.4, "shipping": 0.0, "total": 11835.4}
+
+    # The running sums agree with a cart built fresh with the same lines.
+    assert cart.quote() == _cart(shopping, engine, [("H1", 7)]).quote()
+
+def test_coupon_below_its_minimum_subtotal_is_ignored(shopping):
+    cart = _cart(shopping, _engine(shopping), [("D1", 1)])
+    assert cart.quote() == {"subtotal": 300.0, "discount": 0.0, "coupon": 0.0,
+                            "tax": 36.0, "shipping": 0.0, "total": 336.0}
+    assert not cart.apply_coupon("NOPE")
@@ -0,0 +1,34 @@
+import pytest
+
+@pytest.fixture
+def sharded(banking):
+    with banking.ShardedBank(2) as bank:
+        bank.add_customer(banking.Customer("C1", "Asha", "1 Main Road"))
+        yield bank
+
+def _on_two_shards(bank, banking):
+    accounts = [bank.create_account("C1", "checking", 100.0) for _ in range(2)]
+    assert {bank._shard_of(a.account_number) for a in accounts} == {0, 1}
+    return [a.account_number for a in accounts]
+
+def _balances(bank):
+    return {a.account_number: a.balance for a in bank.get_customer_accounts("C1")}
+
+def test_failed_cross_shard_transfer_leaves_pipes_in_step(sharded, banking):
+    src, dst = _on_two_shards(sharded, banking)
+    assert sharded.transfer_funds(src, dst, float("nan")) is False
+    assert sharded.transfer_funds(src, dst, float("inf")) is False
+    with pytest.raises(TypeError):
+        sharded.transfer_funds(src, dst, "5")
+    assert sharded.deposit(dst, 5.0) is True
+    assert sharded.deposit(src, 5.0) is True
+    assert _balances(sharded) == {src: 105.0, dst: 105.0}
+
+def test_cross_shard_transfers_commit_or_abort_whole(sharded, banking):
+    src, dst = _on_two_shards(sharded, banking)
+    assert sharded.transfer_funds(src, dst, 60.0)
+    assert not sharded.transfer_funds(src, dst, 60.0)
+    assert not sharded.transfer_funds(src, "999999", 10.0)
+    assert _balances(sharded) == {src: 40.0, dst: 160.0}
+    assert sharded.apply_batch([("transfer", dst, src, 10.0), ("transfer", src, dst, float("inf")), ("deposit", src, 1.0)]) == [True, False, True]
+    assert _balances(sharded) == {src: 51.0, dst: 150.0}